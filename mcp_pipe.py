@@ -26,13 +26,37 @@ import subprocess
 import logging
 import os
 import signal
+import socket
+import stat
+import atexit
 import sys
 import json
+import mmap
+import copy
+import hashlib
+import tempfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
+from dataclasses import dataclass, field
 import threading
 import random
-from logging.handlers import RotatingFileHandler
+import time
+import queue
+import re
+import shlex
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+try:
+    import orjson  # faster JSON (de)serialization; stdlib json is the fallback
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl  # cross-process config lock for forked web workers (POSIX only, like the fork itself)
+except ImportError:
+    fcntl = None
 
 # Auto-load environment variables from a .env file if present
 load_dotenv()
@@ -73,26 +97,217 @@ logger.addHandler(file_handler)
 # 状态文件路径
 STATUS_FILE = os.path.join(os.getcwd(), ".mcp_status.json")
 
+# Web 前端静态文件（随代码分发，与工作目录无关）
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# 重用 mcptool.py 的 pid 文件约定
+PID_FILE = os.path.join(os.getcwd(), ".mcp_pid")
+
+# Liveness results are reused for this long; the PID itself is only re-read when the PID file changes
+SERVICE_CHECK_TTL = 1.0
+_SERVICE_CACHE = {"t": 0.0, "mtime": None, "pid": None, "running": False}
+
+def pid_alive(pid):
+    """Whether a process with this PID exists (False if psutil is unavailable)."""
+    try:
+        import psutil
+        # pid_exists is a single kill(pid, 0) on POSIX; Process() reads several /proc files
+        return psutil.pid_exists(pid)
+    except Exception:
+        return False
+
+# Handle of the pipe process started from this (web) process, so stopping it needs no PID-file round-trip
+_PIPE_PROC = None
+
+def is_service_running():
+    """Whether the mcp_pipe process recorded in PID_FILE is alive."""
+    now = time.monotonic()
+    if now - _SERVICE_CACHE["t"] < SERVICE_CHECK_TTL:
+        return _SERVICE_CACHE["running"]
+    try:
+        mtime = os.stat(PID_FILE).st_mtime_ns
+    except OSError:
+        _SERVICE_CACHE.update(t=now, mtime=None, pid=None, running=False)
+        return False
+    pid = _SERVICE_CACHE["pid"]
+    if mtime != _SERVICE_CACHE["mtime"]:
+        try:
+            with open(PID_FILE, 'r') as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            pid = None
+    if pid is not None and _PIPE_PROC is not None and pid == _PIPE_PROC.pid:
+        # Our own child: poll() reaps it once it exits, where pid_exists would still see the zombie
+        running = _PIPE_PROC.poll() is None
+    else:
+        running = pid is not None and pid_alive(pid)
+    _SERVICE_CACHE.update(t=now, mtime=mtime, pid=pid, running=running)
+    return running
+
+def start_pipe_process():
+    """Start mcp_pipe.py in the background and record its PID. Returns the PID, or None if already running."""
+    global _PIPE_PROC
+    if is_service_running():
+        return None
+    # Own session and no stdin, like mcptool's spawn_background: Ctrl+C in the web terminal leaves it running
+    _PIPE_PROC = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=os.environ.copy(),
+                                  stdin=subprocess.DEVNULL, close_fds=True, start_new_session=True)
+    # Reap it as soon as it exits, even if this worker never polls it again (other web workers
+    # only see the PID, and an unreaped zombie still passes pid_exists)
+    threading.Thread(target=_PIPE_PROC.wait, name="pipe-reaper", daemon=True).start()
+    # Still written for `mcptool.py status/stop` and other processes
+    write_file_atomic(PID_FILE, str(_PIPE_PROC.pid).encode())
+    _SERVICE_CACHE["t"] = 0.0
+    return _PIPE_PROC.pid
+
+def stop_pipe_process(timeout=5):
+    """Stop the pipe process: through the Popen handle if we started it, otherwise via PID_FILE.
+
+    Returns True if a running process was signalled.
+    """
+    global _PIPE_PROC
+    proc, _PIPE_PROC = _PIPE_PROC, None
+    stopped = False
+    if proc is not None and proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        stopped = True
+    else:
+        # Started elsewhere (e.g. `mcptool.py start`, or before this process restarted), or our
+        # own child already exited and PID_FILE may now name a pipe started by someone else
+        try:
+            with open(PID_FILE, 'r') as f:
+                pid = int(f.read().strip())
+            # Our exited child's PID is reaped and may be reused; never signal it
+            if (proc is None or pid != proc.pid) and pid_alive(pid):
+                os.kill(pid, signal.SIGTERM)
+                stopped = True
+        except (OSError, ValueError):
+            pass
+    try:
+        os.remove(PID_FILE)
+    except OSError:
+        pass
+    _SERVICE_CACHE["t"] = 0.0
+    return stopped
+
+# 工具状态 -> Web 状态徽章样式（其余状态显示为 status-stopped）
+TOOL_BADGE_CLASSES = {"运行中": "status-running", "错误": "status-error"}
+
 # 状态管理
+def read_status():
+    """Parse STATUS_FILE (orjson, mmap for large files); an empty status if it is missing or unreadable."""
+    try:
+        data = read_json_file(STATUS_FILE)
+    except Exception:
+        data = None
+    if not isinstance(data, dict):
+        data = {}
+    data.setdefault("endpoints", {})
+    data.setdefault("tools", {})
+    return data
+
 def init_status_file():
     """初始化状态文件"""
     try:
         if not os.path.exists(STATUS_FILE):
-            with open(STATUS_FILE, "w", encoding="utf-8") as f:
-                json.dump({
-                    "endpoints": {},
-                    "tools": {}
-                }, f, indent=2)
+            write_file_atomic(STATUS_FILE, json_dumps({
+                "endpoints": {},
+                "tools": {}
+            }, indent=True))
     except Exception as e:
         logger.error(f"初始化状态文件失败: {e}")
 
-def update_tool_status(server_name, status, error="", tools=None):
-    """更新工具状态"""
+# (whole second, formatted string) of the last now_iso() call
+_NOW_ISO = (None, "")
+
+def now_iso():
+    """Local time as ISO-8601 at second precision; formatted at most once per second."""
+    global _NOW_ISO
+    sec = int(time.time())
+    cached = _NOW_ISO
+    if cached[0] != sec:
+        cached = (sec, datetime.fromtimestamp(sec).isoformat())
+        _NOW_ISO = cached
+    return cached[1]
+
+# The pipe keeps the authoritative status in memory; a background thread writes it out,
+# coalescing bursts of updates into one file write
+_STATE = None
+_STATE_LOCK = threading.Lock()
+# Signalled by writers (under _STATE_LOCK) when they leave unflushed changes behind
+_state_changed = threading.Condition(_STATE_LOCK)
+_state_dirty = False
+# Set on shutdown; also what the flusher sleeps on, so shutdown interrupts the debounce wait
+_stop_event = threading.Event()
+_flusher = None
+# Updates within this window after the first one share a single write; short enough
+# that the web (which caches reads for 250 ms) still sees changes promptly
+STATUS_FLUSH_DELAY = float(os.environ.get('MCP_STATUS_FLUSH_DELAY', '0.2'))
+
+def _state():
+    """The in-memory status, seeded from STATUS_FILE on first use. Call with _STATE_LOCK held."""
+    global _STATE
+    if _STATE is None:
+        _STATE = read_status()
+    return _STATE
+
+def flush_status():
+    """Write pending in-memory status changes to STATUS_FILE (atomically, so the web never reads a partial file)."""
+    global _state_dirty
+    with _STATE_LOCK:
+        if _STATE is None or not _state_dirty:
+            return
+        _state_dirty = False
+        payload = json_dumps(_STATE, indent=True)
     try:
-        with open(STATUS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except:
-        data = {"endpoints": {}, "tools": {}}
+        write_file_atomic(STATUS_FILE, payload)
+    except Exception as e:
+        logger.error(f"写入状态文件失败: {e}")
+
+def _flush_loop():
+    while True:
+        # Sleep until a writer signals; no periodic wakeups while nothing changes
+        with _state_changed:
+            while not _state_dirty and not _stop_event.is_set():
+                _state_changed.wait()
+        if _stop_event.wait(STATUS_FLUSH_DELAY):
+            return
+        flush_status()
+
+def stop_status_flusher():
+    """Stop the flusher thread and write out whatever is still pending."""
+    _stop_event.set()
+    with _state_changed:
+        _state_changed.notify_all()
+    if _flusher is not None:
+        _flusher.join(timeout=2)
+    flush_status()
+
+def _mark_status_dirty():
+    """Schedule a flush of the in-memory status. Call with _STATE_LOCK held."""
+    global _flusher, _state_dirty
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, name="mcp-status-flush", daemon=True)
+        _flusher.start()
+        # Don't lose the last updates of the debounce window on shutdown
+        atexit.register(stop_status_flusher)
+    _state_dirty = True
+    _state_changed.notify()
+
+def update_tool_status(server_name, status, error="", tools=None, now=None):
+    """更新工具状态"""
+    # One timestamp per update, shared by the tool entry and the endpoint entry
+    now = now or now_iso()
+    with _STATE_LOCK:
+        _update_tool_status(_state(), server_name, status, error, tools, now)
+        _mark_status_dirty()
+
+def _update_tool_status(data, server_name, status, error, tools, now):
     # If server_name encodes endpoint info (e.g. "server::endpoint"), merge under base server
     base_name = server_name
     if isinstance(server_name, str) and '::' in server_name:
@@ -111,7 +326,7 @@ def update_tool_status(server_name, status, error="", tools=None):
         "status": status,
         "error": error,
         "tools": merged_list,
-        "last_updated": datetime.now().isoformat()
+        "last_updated": now
     }
 
     # Also write tools under the endpoint entry if target encoded as server::endpoint
@@ -120,46 +335,86 @@ def update_tool_status(server_name, status, error="", tools=None):
             endpoint_name = server_name.split('::', 1)[1]
             data.setdefault('endpoints', {})
             ep = data['endpoints'].get(endpoint_name, {})
-            ep_tools = ep.get('tools', [])
             # Replace or merge per-endpoint tools for this server
             # We'll attach a mapping of server -> tools for clarity
             ep.setdefault('server_tools', {})
             ep['server_tools'][base_name] = merged_list
-            ep['last_updated'] = datetime.now().isoformat()
+            ep['last_updated'] = now
             data['endpoints'][endpoint_name] = ep
     except Exception:
         # Don't fail the whole update if per-endpoint write errors out
         pass
-    
-    try:
-        with open(STATUS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        logger.error(f"更新工具状态失败: {e}")
 
 
-def update_endpoint_status(endpoint_name, connected=False, error="", url=None):
+# Status snapshots are shared by all requests within this window; the pipe rewrites the file every few seconds at most
+STATUS_CACHE_TTL = 0.25
+# (monotonic time, (status, generation)); replaced as a whole so readers can skip the lock
+_STATUS_CACHE = (0.0, None)
+_STATUS_LOCK = threading.Lock()
+
+def file_generation(path):
+    """Identify the current version of a file by mtime, size and inode.
+
+    mtime alone can repeat on filesystems with coarse timestamps when two writes land in the
+    same tick; every atomic replace also gets a new inode. Raises OSError if the file is missing.
+    """
+    st = os.stat(path)
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}-{st.st_ino:x}"
+
+def _read_status_uncached(cached=None):
+    """Read (status, generation); reuse cached when the file has not changed."""
+    try:
+        # stat before reading: a write in between yields newer data under an older tag, never the reverse
+        generation = file_generation(STATUS_FILE)
+    except OSError:
+        return {"endpoints": {}, "tools": {}}, "0"
+    if cached is not None and cached[1] == generation:
+        return cached
+    return read_status(), generation
+
+def read_status_snapshot():
+    """Return (status dict, generation). The generation (see file_generation) changes on every write.
+
+    The result is cached for STATUS_CACHE_TTL seconds and shared between callers, so treat it as read-only.
+    After the TTL only a stat() is needed unless the file actually changed.
+    """
+    global _STATUS_CACHE
+    # Fast path without the lock: a single global read sees either the old or the new entry
+    t, value = _STATUS_CACHE
+    if value is not None and time.monotonic() - t < STATUS_CACHE_TTL:
+        return value
+    with _STATUS_LOCK:
+        # Another thread may have refreshed it while we waited
+        t, value = _STATUS_CACHE
+        now = time.monotonic()
+        if value is not None and now - t < STATUS_CACHE_TTL:
+            return value
+        value = _read_status_uncached(value)
+        _STATUS_CACHE = (now, value)
+        return value
+
+
+def update_endpoint_status(endpoint_name, connected=False, error="", url=None, now=None):
     """Update endpoint status in the shared status file."""
     if not endpoint_name:
         return
+    now = now or now_iso()
     try:
-        try:
-            with open(STATUS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = {"endpoints": {}, "tools": {}}
-
-        data.setdefault('endpoints', {})
-        data['endpoints'][endpoint_name] = {
-            'connected': bool(connected),
-            'error': error or '',
-            'url': url or data['endpoints'].get(endpoint_name, {}).get('url', ''),
-            'last_heartbeat': datetime.now().isoformat(),
-            'last_updated': datetime.now().isoformat()
-        }
-
-        with open(STATUS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        with _STATE_LOCK:
+            data = _state()
+            prev = data['endpoints'].get(endpoint_name) or {}
+            entry = {
+                'connected': bool(connected),
+                'error': error or '',
+                'url': url or prev.get('url', ''),
+                'last_heartbeat': now,
+                'last_updated': now
+            }
+            data['endpoints'][endpoint_name] = entry
+            # Several servers share one endpoint and each reports the same state on (re)connect;
+            # only a real transition is worth a file write. Timestamps ride along with the next one.
+            if any(prev.get(k) != entry[k] for k in ('connected', 'error', 'url')):
+                _mark_status_dirty()
     except Exception as e:
         logger.error(f"更新端点状态失败: {e}")
 
@@ -199,25 +454,24 @@ async def get_tools_from_server_async(process, target):
         logger.warning(f"[{target}] 获取工具列表失败: {e}")
         return []
 
-def get_tools_from_server(process, target):
-    """从MCP服务器获取工具列表（同步包装）"""
-    try:
-        return asyncio.run(get_tools_from_server_async(process, target))
-    except Exception as e:
-        logger.warning(f"[{target}] 获取工具列表失败: {e}")
-        return []
-
 # Reconnection settings
 INITIAL_BACKOFF = 1  # Initial wait time in seconds
 MAX_BACKOFF = 600  # Maximum wait time in seconds
+# A session must stay up this long before the backoff starts over; shorter ones
+# (auth rejection, immediate close by an overloaded server) keep backing off
+STABLE_SESSION_SECONDS = 60
 # Limit concurrent connection attempts to avoid overwhelming network/resources
 MAX_CONCURRENT_CONNECTIONS = int(os.environ.get('MCP_MAX_CONCURRENT_CONNECTIONS', '8'))
+# Liveness is left to the websockets keepalive; status is only written on connect/disconnect
+PING_INTERVAL = float(os.environ.get('MCP_PING_INTERVAL', '20'))
+PING_TIMEOUT = float(os.environ.get('MCP_PING_TIMEOUT', '20'))
 
 async def connect_with_retry(uri, target, semaphore: asyncio.Semaphore = None):
     """Connect to WebSocket server with retry mechanism for a given server target."""
     reconnect_attempt = 0
     backoff = INITIAL_BACKOFF
     while True:  # Infinite reconnection
+        session = {}
         try:
             if reconnect_attempt > 0:
                 logger.info(f"[{target}] Waiting {backoff}s before reconnection attempt {reconnect_attempt}...")
@@ -228,7 +482,7 @@ async def connect_with_retry(uri, target, semaphore: asyncio.Semaphore = None):
                 await semaphore.acquire()
             try:
                 # Attempt to connect
-                await connect_to_server(uri, target)
+                await connect_to_server(uri, target, session)
             finally:
                 if semaphore is not None:
                     try:
@@ -237,6 +491,13 @@ async def connect_with_retry(uri, target, semaphore: asyncio.Semaphore = None):
                         pass
 
         except Exception as e:
+            connected_at = session.get("connected_at")
+            if connected_at is not None and time.monotonic() - connected_at >= STABLE_SESSION_SECONDS:
+                # The connection was up for a while (keepalive or server closed it): start over from the initial backoff
+                reconnect_attempt = 1
+                backoff = INITIAL_BACKOFF
+                logger.warning(f"[{target}] Connection closed: {e}")
+                continue
             reconnect_attempt += 1
             logger.warning(f"[{target}] Connection closed (attempt {reconnect_attempt}): {e}")
             # Calculate wait time for next reconnection (exponential backoff with jitter)
@@ -244,13 +505,21 @@ async def connect_with_retry(uri, target, semaphore: asyncio.Semaphore = None):
             jitter = random.uniform(0, min(1.0, backoff))
             backoff = backoff + jitter
 
-async def connect_to_server(uri, target):
-    """Connect to WebSocket server and pipe stdio for the given server target."""
+async def connect_to_server(uri, target, session=None):
+    """Connect to WebSocket server and pipe stdio for the given server target.
+
+    session, if given, gets "connected_at" (time.monotonic()) set once the WebSocket handshake succeeded.
+    """
     process = None
+    # One thread each for the stdout reader, stderr reader, stdin writer and the final wait.
+    # Not the default executor: the readers block for the whole connection and would starve it.
+    io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix=f"pipe-{target}")
     try:
         logger.info(f"[{target}] Connecting to WebSocket server...")
-        async with websockets.connect(uri) as websocket:
+        async with websockets.connect(uri, ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT) as websocket:
             logger.info(f"[{target}] Successfully connected to WebSocket server")
+            if session is not None:
+                session["connected_at"] = time.monotonic()
 
             # determine endpoint name if target encoded as server::endpoint
             endpoint_name = None
@@ -294,24 +563,26 @@ async def connect_to_server(uri, target):
 
             # Create two tasks: read from WebSocket and write to process, read from process and write to WebSocket
             await asyncio.gather(
-                pipe_websocket_to_process(websocket, process, target),
-                pipe_process_to_websocket(process, websocket, target),
-                pipe_process_stderr_to_terminal(process, target)
+                pipe_websocket_to_process(websocket, process, target, io_pool),
+                pipe_process_to_websocket(process, websocket, target, io_pool),
+                pipe_process_stderr_to_terminal(process, target, io_pool)
             )
     except websockets.exceptions.ConnectionClosed as e:
         code = getattr(e, 'code', None)
         reason = getattr(e, 'reason', None)
         logger.warning(f"[{target}] WebSocket connection closed: code={code} reason={reason}")
-        update_tool_status(target, "错误", f"WebSocket连接关闭: code={code} reason={reason}")
+        now = now_iso()
+        update_tool_status(target, "错误", f"WebSocket连接关闭: code={code} reason={reason}", now=now)
         # update endpoint status as disconnected with error
         endpoint_name = target.split('::', 1)[1] if ('::' in target) else uri
-        update_endpoint_status(endpoint_name, connected=False, error=f"code={code} reason={reason}", url=uri)
+        update_endpoint_status(endpoint_name, connected=False, error=f"code={code} reason={reason}", url=uri, now=now)
         raise  # Re-throw exception to trigger reconnection
     except Exception as e:
         logger.error(f"[{target}] Connection error: {e}")
-        update_tool_status(target, "错误", f"连接错误: {e}")
+        now = now_iso()
+        update_tool_status(target, "错误", f"连接错误: {e}", now=now)
         endpoint_name = target.split('::', 1)[1] if ('::' in target) else uri
-        update_endpoint_status(endpoint_name, connected=False, error=str(e), url=uri)
+        update_endpoint_status(endpoint_name, connected=False, error=str(e), url=uri, now=now)
         raise  # Re-throw exception
     finally:
         # Ensure the child process is properly terminated
@@ -319,25 +590,32 @@ async def connect_to_server(uri, target):
             logger.info(f"[{target}] Terminating server process")
             try:
                 process.terminate()
-                process.wait(timeout=5)
+                # Wait off the event loop so other connections keep flowing meanwhile
+                await asyncio.get_running_loop().run_in_executor(io_pool, process.wait, 5)
             except subprocess.TimeoutExpired:
                 process.kill()
             logger.info(f"[{target}] Server process terminated")
             update_tool_status(target, "已停止")
+        # Readers still blocked on a killed child return at EOF; don't hold the loop for them
+        io_pool.shutdown(wait=False)
+
+def _write_line(stream, line):
+    stream.write(line + '\n')
+    stream.flush()
 
-async def pipe_websocket_to_process(websocket, process, target):
+async def pipe_websocket_to_process(websocket, process, target, io_pool):
     """Read data from WebSocket and write to process stdin"""
+    loop = asyncio.get_running_loop()
     try:
         while True:
             # Read message from WebSocket
             message = await websocket.recv()
             logger.debug(f"[{target}] << {message[:120]}...")
             
-            # Write to process stdin (in text mode)
+            # Write to process stdin (in text mode); a full pipe blocks, so do it off the event loop
             if isinstance(message, bytes):
                 message = message.decode('utf-8')
-            process.stdin.write(message + '\n')
-            process.stdin.flush()
+            await loop.run_in_executor(io_pool, _write_line, process.stdin, message)
     except Exception as e:
         # Often this is a ConnectionClosed error from server (e.g., code 4004). Log details at warning level.
         if isinstance(e, websockets.exceptions.ConnectionClosed):
@@ -352,12 +630,13 @@ async def pipe_websocket_to_process(websocket, process, target):
         if not process.stdin.closed:
             process.stdin.close()
 
-async def pipe_process_to_websocket(process, websocket, target):
+async def pipe_process_to_websocket(process, websocket, target, io_pool):
     """Read data from process stdout and send to WebSocket"""
+    loop = asyncio.get_running_loop()
     try:
         while True:
             # Read data from process stdout
-            data = await asyncio.to_thread(process.stdout.readline)
+            data = await loop.run_in_executor(io_pool, process.stdout.readline)
             
             if not data:  # If no data, the process may have ended
                 logger.info(f"[{target}] Process has ended output")
@@ -377,12 +656,13 @@ async def pipe_process_to_websocket(process, websocket, target):
             logger.error(f"[{target}] Error in process to WebSocket pipe: {e}")
         raise  # Re-throw exception to trigger reconnection
 
-async def pipe_process_stderr_to_terminal(process, target):
+async def pipe_process_stderr_to_terminal(process, target, io_pool):
     """Read data from process stderr and print to terminal"""
+    loop = asyncio.get_running_loop()
     try:
         while True:
             # Read data from process stderr
-            data = await asyncio.to_thread(process.stderr.readline)
+            data = await loop.run_in_executor(io_pool, process.stderr.readline)
             
             if not data:  # If no data, the process may have ended
                 logger.info(f"[{target}] Process has ended stderr output")
@@ -400,18 +680,285 @@ def signal_handler(sig, frame):
     logger.info("Received interrupt signal, shutting down...")
     sys.exit(0)
 
+def json_dumps(obj, indent=False):
+    """Serialize obj to UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+def json_loads(data):
+    """Parse JSON from bytes or str (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Files larger than this are parsed from a read-only mmap instead of a read() copy
+MMAP_THRESHOLD = 64 * 1024
+
+def read_json_file(path):
+    """Read and parse a JSON file. Large files are parsed directly from a read-only mmap."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= MMAP_THRESHOLD:
+            # mmap setup costs more than a plain read() for small files
+            return json_loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if orjson is not None:
+                with memoryview(mm) as view:
+                    return orjson.loads(view)
+            return json.loads(mm[:])
+
+# Process umask, read once at import (os.umask can only be queried by setting it)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+def write_file_atomic(path, data):
+    """Write bytes to a temp file next to path and swap it in, so readers never see a partial file.
+
+    The result keeps path's current permissions, or gets the umask default for a new file
+    (mkstemp itself creates 0600).
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def config_path():
+    """Path of the active config file: $MCP_CONFIG or ./mcp_config.json."""
+    return os.environ.get("MCP_CONFIG") or os.path.join(os.getcwd(), "mcp_config.json")
+
+def normalize_config(cfg):
+    """Give the config the shape readers rely on, so callers can index the sections directly
+    instead of repeating .get(..., {}) fallbacks.
+
+    Per-entry defaults (disabled/enabled) are not filled in: this also runs on save, and they
+    would be written into the user's file. ServerConfig/EndpointConfig apply them on read.
+    """
+    if not isinstance(cfg, dict):
+        cfg = {}
+    for key in ("mcpServers", "mcpEndpoints"):
+        if not isinstance(cfg.get(key), dict):
+            cfg[key] = {}
+    servers = cfg["mcpServers"]
+    for name, entry in servers.items():
+        if entry is None:
+            servers[name] = {}
+    endpoints = cfg["mcpEndpoints"]
+    for name, ep in endpoints.items():
+        if ep is None:
+            endpoints[name] = {}
+    return cfg
+
+# Last parsed config, keyed on (path, file_generation); callers get deep copies so they may mutate freely
+# "digest" is the hash of the body we last wrote, valid only while "key" still matches the file
+_CFG_CACHE = {"key": None, "data": None, "enabled_endpoints": None, "digest": None}
+# Held across load -> mutate -> save so concurrent web writes don't lose each other's edits
+_CFG_LOCK = threading.RLock()
+# Nesting depth of config_transaction in this process (guarded by _CFG_LOCK); only the
+# outermost level takes the file lock, a second flock() from the same process would block
+_CFG_TXN = {"depth": 0}
+
 def load_config():
-    """Load JSON config from $MCP_CONFIG or ./mcp_config.json. Return dict or {}."""
-    path = os.environ.get("MCP_CONFIG") or os.path.join(os.getcwd(), "mcp_config.json")
-    if not os.path.exists(path):
-        return {}
+    """Load JSON config from $MCP_CONFIG or ./mcp_config.json, normalized (see normalize_config).
+
+    The parsed file is cached until the file changes (see file_generation).
+    """
+    return copy.deepcopy(_cached_config())
+
+def _cached_config():
+    """The shared parsed config; callers must not mutate it."""
+    path = config_path()
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.warning(f"Failed to load config {path}: {e}")
-        return {}
+        key = (path, file_generation(path))
+    except OSError:
+        return normalize_config({})
+    with _CFG_LOCK:
+        if key == _CFG_CACHE["key"]:
+            return _CFG_CACHE["data"]
+        try:
+            data = normalize_config(read_json_file(path))
+        except Exception as e:
+            logger.warning(f"Failed to load config {path}: {e}")
+            return normalize_config({})
+        _CFG_CACHE.update(key=key, data=data, enabled_endpoints=None, digest=None)
+        return data
 
+def save_config(cfg):
+    """Write the config file and refresh the cache so the next load skips the re-read.
+
+    A save identical to what we last wrote is skipped if the file has not changed since.
+    """
+    cfg = normalize_config(cfg)
+    path = config_path()
+    body = json_dumps(cfg, indent=True)
+    digest = hashlib.blake2b(body, digest_size=16).digest()
+    with _CFG_LOCK:
+        if digest == _CFG_CACHE["digest"]:
+            try:
+                if _CFG_CACHE["key"] == (path, file_generation(path)):
+                    return
+            except OSError:
+                pass
+        write_file_atomic(path, body)
+        _CFG_CACHE.update(key=(path, file_generation(path)), data=copy.deepcopy(cfg),
+                          enabled_endpoints=None, digest=digest)
+
+def config_transaction(func):
+    """Run a load -> mutate -> save handler under the config lock.
+
+    Besides the in-process lock, an flock on <config>.lock serializes the handler with the
+    other web workers (see fork_web_workers), which each hold their own _CFG_LOCK.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _CFG_LOCK:
+            lock_file = None
+            if fcntl is not None and not _CFG_TXN["depth"]:
+                lock_file = open(config_path() + '.lock', 'a')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _CFG_TXN["depth"] += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _CFG_TXN["depth"] -= 1
+                if lock_file is not None:
+                    lock_file.close()  # releases the flock
+    return wrapper
+
+
+SERVER_TYPES = ("stdio", "sse", "http", "streamablehttp")
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """Typed view of one mcpServers entry, parsed once for launching servers."""
+    name: str
+    type: str = "stdio"
+    command: str = ""
+    args: tuple = ()
+    url: str = ""
+    env: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+    disabled: bool = False
+
+    @classmethod
+    def from_entry(cls, name, entry):
+        return cls(
+            name=name,
+            type=(entry.get("type") or entry.get("transportType") or "stdio").lower(),
+            command=entry.get("command") or "",
+            args=tuple(entry.get("args") or ()),
+            url=entry.get("url") or "",
+            env=dict(entry.get("env") or {}),
+            headers=dict(entry.get("headers") or {}),
+            disabled=bool(entry.get("disabled")),
+        )
+
+@dataclass(frozen=True)
+class EndpointConfig:
+    """Typed view of one mcpEndpoints entry."""
+    name: str
+    url: str = ""
+    enabled: bool = True
+
+    @classmethod
+    def from_entry(cls, name, entry):
+        return cls(name=name, url=entry.get("url") or "", enabled=bool(entry.get("enabled", True)))
+
+def server_configs(cfg):
+    """{name: ServerConfig} for a normalized config (see load_config)."""
+    return {name: ServerConfig.from_entry(name, entry) for name, entry in cfg["mcpServers"].items()}
+
+def endpoint_configs(cfg):
+    """{name: EndpointConfig} for a normalized config (see load_config)."""
+    return {name: EndpointConfig.from_entry(name, ep) for name, ep in cfg["mcpEndpoints"].items()}
+
+def get_enabled_endpoints():
+    """Enabled endpoints that have a URL, in config order; computed once per parsed config."""
+    with _CFG_LOCK:
+        data = _cached_config()
+        cached = _CFG_CACHE["enabled_endpoints"]
+        if cached is not None and _CFG_CACHE["data"] is data:
+            return cached
+        result = tuple(ep for ep in endpoint_configs(data).values() if ep.enabled and ep.url)
+        if _CFG_CACHE["data"] is data:
+            _CFG_CACHE["enabled_endpoints"] = result
+        return result
+
+def validate_servers(servers):
+    """Check each entry of an mcpServers dict; returns the first error message, or None."""
+    for name, entry in servers.items():
+        if not isinstance(entry, dict):
+            return f"服务器 {name} 的配置必须为对象"
+        typ = entry.get("type") or entry.get("transportType") or "stdio"
+        if not isinstance(typ, str) or typ.lower() not in SERVER_TYPES:
+            return f"服务器 {name} 的类型不受支持: {typ}"
+        typ = typ.lower()
+        if typ == "stdio":
+            if not isinstance(entry.get("command"), str) or not entry.get("command"):
+                return f"服务器 {name} 缺少 command"
+            if not isinstance(entry.get("args", []), list):
+                return f"服务器 {name} 的 args 必须为数组"
+        elif not isinstance(entry.get("url"), str) or not entry.get("url"):
+            return f"服务器 {name} 缺少 url"
+        for key in ("env", "headers"):
+            if not isinstance(entry.get(key, {}), dict):
+                return f"服务器 {name} 的 {key} 必须为对象"
+        if not isinstance(entry.get("disabled", False), bool):
+            return f"服务器 {name} 的 disabled 必须为布尔值"
+    return None
+
+def validate_endpoints(endpoints):
+    """Check each entry of an mcpEndpoints dict; returns the first error message, or None.
+
+    A disabled endpoint may be left without a url.
+    """
+    for name, ep in endpoints.items():
+        if not isinstance(ep, dict):
+            return f"接入点 {name} 的配置必须为对象"
+        enabled = ep.get("enabled", True)
+        if not isinstance(enabled, bool):
+            return f"接入点 {name} 的 enabled 必须为布尔值"
+        url = ep.get("url")
+        if enabled and (not isinstance(url, str) or not url):
+            return f"接入点 {name} 缺少 url"
+        if url is not None and not isinstance(url, str):
+            return f"接入点 {name} 的 url 必须为字符串"
+    return None
+
+def validate_config(cfg, previous=None):
+    """Check the shape of a config dict before it is written to disk.
+
+    Only entries that differ from previous (the config currently on disk) are checked,
+    so an existing bad entry does not block edits, including the one that fixes it.
+    Returns an error message, or None if the config is valid.
+    """
+    if not isinstance(cfg, dict):
+        return "配置必须是 JSON 对象"
+    previous = previous or {}
+    for section, validate, message in (("mcpServers", validate_servers, "mcpServers 必须为对象"),
+                                       ("mcpEndpoints", validate_endpoints, "mcpEndpoints 必须为对象")):
+        entries = cfg.get(section, {})
+        if not isinstance(entries, dict):
+            return message
+        old = previous.get(section) or {}
+        err = validate({name: entry for name, entry in entries.items() if old.get(name) != entry})
+        if err:
+            return err
+    return None
 
 def build_server_command(target=None):
     """Build [cmd,...] and env for the server process for a given target.
@@ -428,29 +975,26 @@ def build_server_command(target=None):
     # If target encoded as 'server::endpoint', use server part for command lookup
     if isinstance(target, str) and '::' in target:
         target = target.split('::', 1)[0]
-    cfg = load_config()
-    servers = cfg.get("mcpServers", {}) if isinstance(cfg, dict) else {}
+    servers = server_configs(load_config())
 
     if target in servers:
-        entry = servers[target] or {}
-        if entry.get("disabled"):
+        server = servers[target]
+        if server.disabled:
             raise RuntimeError(f"Server '{target}' is disabled in config")
-        typ = (entry.get("type") or entry.get("transportType") or "stdio").lower()
+        typ = server.type
 
         # environment for child process
         child_env = os.environ.copy()
-        for k, v in (entry.get("env") or {}).items():
+        for k, v in server.env.items():
             child_env[str(k)] = str(v)
 
         if typ == "stdio":
-            command = entry.get("command")
-            args = entry.get("args") or []
-            if not command:
+            if not server.command:
                 raise RuntimeError(f"Server '{target}' is missing 'command'")
-            return [command, *args], child_env
+            return [server.command, *server.args], child_env
 
         if typ in ("sse", "http", "streamablehttp"):
-            url = entry.get("url")
+            url = server.url
             if not url:
                 raise RuntimeError(f"Server '{target}' (type {typ}) is missing 'url'")
             # Unified approach: always use current Python to run mcp-proxy module
@@ -458,8 +1002,7 @@ def build_server_command(target=None):
             if typ in ("http", "streamablehttp"):
                 cmd += ["--transport", "streamablehttp"]
             # optional headers: {"Authorization": "Bearer xxx"}
-            headers = entry.get("headers") or {}
-            for hk, hv in headers.items():
+            for hk, hv in server.headers.items():
                 cmd += ["-H", hk, str(hv)]
             cmd.append(url)
             return cmd, child_env
@@ -477,13 +1020,103 @@ def build_server_command(target=None):
 # ------------------------------
 # Minimal Web UI (non-intrusive)
 # ------------------------------
+def get_web_logger():
+    """Logger for web handlers. Records are queued and written by a listener thread,
+    so a slow console never blocks a request thread."""
+    web_logger = logging.getLogger('MCP_WEB')
+    if not web_logger.handlers:
+        web_logger.setLevel(logging.INFO)
+        web_logger.propagate = False
+        log_queue = queue.Queue(-1)
+        web_logger.addHandler(QueueHandler(log_queue))
+        console = logging.StreamHandler()
+        console.setFormatter(formatter)
+        # One file per web process: rotating a file shared across processes loses lines
+        log_name = f'mcp_web.{WEB_WORKER_INDEX}.log' if WEB_WORKER_INDEX else 'mcp_web.log'
+        web_file = RotatingFileHandler(os.path.join(LOG_DIR, log_name), maxBytes=1_000_000, backupCount=3, encoding='utf-8')
+        web_file.setFormatter(formatter)
+        listener = QueueListener(log_queue, console, web_file)
+        listener.start()
+        atexit.register(listener.stop)
+    return web_logger
+
 def create_app():
     """Create a minimal Flask app that only reads status/config and can request restart.
     It does not start any background threads or connect to endpoints.
     """
-    from flask import Flask, jsonify, request, render_template_string
+    from flask import Flask, request
 
     app = Flask(__name__)
+    web_logger = get_web_logger()
+
+    def json_response(obj):
+        """jsonify() replacement that serializes with orjson when available."""
+        return app.response_class(json_dumps(obj), mimetype='application/json')
+
+    # Fixed success payloads, encoded once; each request still gets its own Response
+    # object because after_request hooks (compression) mutate headers and body.
+    canned_bodies = {
+        msg: json_dumps({"status": "success", "message": msg})
+        for msg in ("配置已保存", "已触发重启（stop->start）", "MCP服务已在运行中", "已请求启动",
+                    "MCP服务未在运行", "已停止", "mcpServers 已合并")
+    }
+
+    def success_response(msg):
+        """Response for a fixed success message, without re-encoding it."""
+        return app.response_class(canned_bodies[msg], mimetype='application/json')
+
+    def etag_json_response(body, etag):
+        """JSON response tagged with etag (a hash of body); 304 if the client already holds that body."""
+        if etag in request.if_none_match:
+            resp = app.response_class(status=304)
+        else:
+            resp = app.response_class(body, mimetype='application/json')
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
+
+    def request_json():
+        """Parse the request body as JSON; None if it is empty or malformed."""
+        try:
+            return json_loads(request.get_data())
+        except ValueError:
+            return None
+
+    # Required keys of each write endpoint's JSON body: (key, type, message when missing/invalid)
+    BODY_SCHEMAS = {
+        'config': (),
+        'server_update': (),
+        'server_add': (('name', str, "name 与 type 必填"), ('type', str, "name 与 type 必填")),
+        'server_merge': (('mcpServers', dict, "mcpServers 必须为对象"),),
+    }
+
+    def read_body(op):
+        """Parse the request body and check it against BODY_SCHEMAS[op].
+
+        Returns (body, None), or (None, error response) for a malformed body.
+        """
+        body = request_json() or {}
+        if not isinstance(body, dict):
+            return None, (json_response({"status": "error", "message": "请求体必须是 JSON 对象"}), 400)
+        for key, typ, message in BODY_SCHEMAS[op]:
+            value = body.get(key)
+            if not isinstance(value, typ) or (typ is str and not value.strip()):
+                return None, (json_response({"status": "error", "message": message}), 400)
+        return body, None
+
+    # gzip/br compression for the page and JSON responses (optional dependency)
+    try:
+        from flask_compress import Compress
+        app.config.update(
+            COMPRESS_ALGORITHM=['br', 'gzip'],
+            COMPRESS_MIN_SIZE=512,
+            COMPRESS_LEVEL=5,
+            # text/event-stream is left out on purpose: compressing it would buffer the pushes
+            COMPRESS_MIMETYPES=['text/html', 'text/css', 'application/json', 'application/javascript'],
+        )
+        Compress(app)
+    except ImportError:
+        pass
 
     INDEX_HTML = """
     <!DOCTYPE html>
@@ -491,92 +1124,7 @@ def create_app():
     <head>
         <meta charset="utf-8" />
         <title>MCP 管理面板</title>
-        <style>
-            /* 基础与背景 */
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                max-width: 1200px;
-                margin: 0 auto;
-                padding: 20px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: #333;
-                min-height: 100vh;
-            }
-            h1 {
-                color: #ffffff;
-                text-align: center;
-                margin: 20px 0 30px;
-                text-shadow: 0 2px 4px rgba(0,0,0,0.3);
-                font-size: 2.2em;
-                font-weight: 300;
-            }
-            /* 卡片/区块 */
-            .card {
-                background-color: #ffffff;
-                margin-bottom: 16px;
-                padding: 20px;
-                border-radius: 16px;
-                box-shadow: 0 8px 25px rgba(0,0,0,0.08);
-                transition: all 0.25s ease;
-                border: 1px solid rgba(255,255,255,0.2);
-            }
-            .card:hover { transform: translateY(-2px); box-shadow: 0 12px 32px rgba(0,0,0,0.12); }
-            h3 { color: #34495e; margin: 10px 0 12px; font-size: 1.1em; font-weight: 600; }
-            /* 表单控件 */
-            input, textarea, select {
-                width: 100%;
-                padding: 12px 16px;
-                margin: 8px 0 12px;
-                box-sizing: border-box;
-                border: 2px solid #e1e5e9;
-                border-radius: 10px;
-                font-size: 14px;
-                transition: all 0.25s ease;
-                background: #fafbfc;
-            }
-            input:focus, textarea:focus, select:focus {
-                border-color: #667eea;
-                outline: none;
-                box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.12);
-                background: #ffffff;
-            }
-            textarea { resize: vertical; min-height: 80px; font-family: 'Courier New', monospace; }
-            /* 按钮样式 */
-            button {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: #fff;
-                padding: 10px 18px;
-                border: none;
-                border-radius: 10px;
-                cursor: pointer;
-                transition: all 0.2s ease;
-                font-size: 14px;
-                font-weight: 500;
-                margin: 4px 8px 4px 0;
-                box-shadow: 0 4px 14px rgba(102, 126, 234, 0.28);
-            }
-            button:hover { transform: translateY(-1px); box-shadow: 0 6px 18px rgba(102,126,234,0.36); }
-            button.stop { background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%); box-shadow: 0 4px 14px rgba(231, 76, 60, 0.28); }
-            button.backup { background: linear-gradient(135deg, #f39c12 0%, #d35400 100%); box-shadow: 0 4px 14px rgba(243, 156, 18, 0.28); }
-            /* 布局辅助 */
-            .row { display: flex; gap: 12px; align-items: center; flex-wrap: wrap; }
-            .grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(280px, 1fr)); gap: 14px; }
-            .server-card { background:#fff; border:1px solid #eef2f7; border-radius:14px; padding:14px; box-shadow: 0 4px 16px rgba(0,0,0,0.06); }
-            .server-card h4 { margin: 0 0 8px; font-size: 15px; color:#2c3e50; font-weight: 600; }
-            .server-meta { font-size:12px; color:#64748b; margin-bottom: 8px; display:flex; justify-content: space-between; }
-            .tool-chip { display:inline-block; padding:6px 10px; background:#f8fafc; border:1px solid #e6ebf1; border-radius: 16px; font-size:12px; color:#475569; margin: 2px; }
-            pre { background: #f8fafc; padding: 12px; border-radius: 8px; overflow: auto; border: 1px solid #eef2f7; }
-            .small { font-size: 12px; color: #64748b; }
-            /* 状态徽章 */
-            .status-badge { display: inline-block; padding: 3px 8px; border-radius: 12px; font-size: 12px; font-weight: 700; margin-left: 8px; }
-            .status-connected { background-color: #d5f5e3; color: #27ae60; }
-            .status-disconnected { background-color: #fadbd8; color: #e74c3c; }
-            .status-running { background-color: #e8f8ff; color: #2a7fb8; }
-            .status-stopped { background-color: #f5e8c8; color: #d35400; }
-            .status-error { background-color: #fde2e2; color: #c0392b; }
-            /* 工具标签 */
-            .tool-tag { display:inline-block; padding:6px 12px; background:#fff; border:1px solid #dee2e6; border-radius: 20px; font-size:13px; color:#495057; margin: 2px; }
-        </style>
+        <link rel="stylesheet" href="{{ app_css }}" />
     </head>
     <body>
         <h1>mcptool v2</h1>
@@ -589,11 +1137,15 @@ def create_app():
         </div>
         <div class="card">
             <h3 style="margin-bottom:10px;">仪表盘</h3>
-            <div id="dashboard" class="grid" style="grid-template-columns: repeat(3, minmax(160px, 1fr));">
+            <div id="dashboard" class="grid" style="grid-template-columns: repeat(4, minmax(160px, 1fr));">
                 <div class="server-card" style="text-align:center;">
                     <div class="small" style="margin-bottom:6px;">服务器数量</div>
                     <div id="metric-servers" style="font-size:28px; font-weight:700; color:#2c3e50;">-</div>
                 </div>
+                <div class="server-card" style="text-align:center;">
+                    <div class="small" style="margin-bottom:6px;">运行中服务器</div>
+                    <div id="metric-running" style="font-size:28px; font-weight:700; color:#2c3e50;">-</div>
+                </div>
                 <div class="server-card" style="text-align:center;">
                     <div class="small" style="margin-bottom:6px;">接入点数量</div>
                     <div id="metric-endpoints" style="font-size:28px; font-weight:700; color:#2c3e50; cursor:pointer;" onclick="openEndpointsModal()" title="点击设置接入点">-</div>
@@ -614,358 +1166,7 @@ def create_app():
             </div>
             <div id="server-grid" class="grid" style="margin-top:8px;">(点击上方“刷新状态”)</div>
         </div>
-        <script>
-            async function refreshStatus(){
-                const [st, mt, svc] = await Promise.all([
-                    fetch('/api/status').then(r=>r.json()),
-                    fetch('/api/metrics').then(r=>r.json()),
-                    fetch('/api/service').then(r=>r.json())
-                ]);
-                renderDashboard(mt);
-                renderServerCards(st);
-                renderServiceToggle(svc);
-            }
-            async function doRestart(){
-                const res = await fetch('/api/restart', { method: 'POST' });
-                const data = await res.json();
-                alert(data.message || '已触发重启');
-            }
-
-            function renderDashboard(metrics){
-                if(!metrics || metrics.error){ return; }
-                document.getElementById('metric-servers').textContent = metrics.num_servers ?? '-';
-                document.getElementById('metric-endpoints').textContent = metrics.num_endpoints ?? '-';
-                document.getElementById('metric-tools').textContent = metrics.total_tools ?? '-';
-            }
-
-            function renderServerCards(status){
-                const wrap = document.getElementById('server-grid');
-                const toolsMap = (status && status.tools) || {};
-                const serverNames = Object.keys(toolsMap).sort();
-                if(serverNames.length === 0){ wrap.textContent = '(暂无工具信息)'; return; }
-                const frag = document.createDocumentFragment();
-                serverNames.forEach(name => {
-                    const s = toolsMap[name] || {};
-                    const tools = s.tools || [];
-                    const card = document.createElement('div');
-                    card.className = 'server-card';
-                    const h4 = document.createElement('h4');
-                    h4.textContent = name;
-                    const gear = document.createElement('span'); 
-                    gear.textContent='⚙'; 
-                    gear.title='设置'; 
-                    gear.style.float='right'; 
-                    gear.style.cursor='pointer';
-                    gear.onclick = async ()=>{
-                        // 获取当前配置并打开编辑弹窗
-                        const cfg = await (await fetch('/api/config')).json();
-                        const entry = (cfg && cfg.mcpServers && cfg.mcpServers[name]) || {};
-                        openEditServerModal(name, entry);
-                    };
-                    const meta = document.createElement('div');
-                    meta.className = 'server-meta';
-                    const st = document.createElement('span'); st.textContent = s.status || '未知';
-                    const ct = document.createElement('span'); ct.textContent = '工具: ' + tools.length;
-                    meta.appendChild(st); meta.appendChild(ct);
-                    const list = document.createElement('div');
-                    tools.forEach(t => { const chip = document.createElement('span'); chip.className='tool-chip'; chip.textContent=(t.name||'unknown'); list.appendChild(chip); });
-                    card.appendChild(gear); card.appendChild(h4); card.appendChild(meta); card.appendChild(list);
-                    frag.appendChild(card);
-                });
-                wrap.innerHTML=''; wrap.appendChild(frag);
-            }
-
-
-            async function toggleService(){
-                const btn = document.getElementById('btn-toggle');
-                btn.disabled = true; btn.textContent = '处理中...';
-                try{
-                    const svc = await (await fetch('/api/service')).json();
-                    if(svc.running){ await fetch('/api/stop', { method: 'POST' }); }
-                    else { await fetch('/api/start', { method: 'POST' }); }
-                    setTimeout(refreshStatus, 800);
-                } finally {
-                    setTimeout(()=>{ btn.disabled=false; }, 900);
-                }
-            }
-
-            function renderServiceToggle(svc){
-                const btn = document.getElementById('btn-toggle');
-                btn.textContent = (svc && svc.running) ? '关闭服务' : '打开服务';
-            }
-
-            // 弹窗功能
-            function openEditServerModal(name, entry){
-                const modal = document.getElementById('modal-edit');
-                modal.style.display = 'block';
-                document.getElementById('edit-old-name').value = name;
-                document.getElementById('edit-name').value = name;
-                document.getElementById('edit-type').value = entry.type||'';
-                document.getElementById('edit-command').value = entry.command||'';
-                document.getElementById('edit-args').value = (entry.args||[]).join(' ');
-                document.getElementById('edit-url').value = entry.url||'';
-                document.getElementById('edit-env').value = entry.env?JSON.stringify(entry.env):'';
-                document.getElementById('edit-disabled').value = String(!!entry.disabled);
-            }
-            
-            async function saveEditServer(){
-                const oldName = document.getElementById('edit-old-name').value.trim();
-                const newName = document.getElementById('edit-name').value.trim();
-                const type = document.getElementById('edit-type').value.trim();
-                const command = document.getElementById('edit-command').value.trim();
-                const args = document.getElementById('edit-args').value.trim();
-                const url = document.getElementById('edit-url').value.trim();
-                const envStr = document.getElementById('edit-env').value.trim();
-                const disabledStr = document.getElementById('edit-disabled').value.trim();
-                let env={}; if(envStr){ try{ env=JSON.parse(envStr); }catch(e){ alert('env需为JSON'); return; } }
-                const payload = { type, command, args, url, env, disabled: (disabledStr||'').toLowerCase()==='true' };
-                if(newName && newName!==oldName){
-                    const addRes = await fetch('/api/servers', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ name:newName, ...payload }) });
-                    const addData = await addRes.json(); if(addData.status!=='success'){ alert(addData.message||'改名失败'); return; }
-                    await fetch('/api/servers/'+encodeURIComponent(oldName), { method:'DELETE' });
-                } else {
-                    const up = await fetch('/api/servers/'+encodeURIComponent(oldName), { method:'PUT', headers:{'Content-Type':'application/json'}, body: JSON.stringify(payload) });
-                    const d = await up.json(); if(d.status!=='success'){ alert(d.message||'保存失败'); return; }
-                }
-                closeModal('modal-edit');
-                await refreshStatus();
-            }
-            
-            async function deleteEditServer(){
-                const oldName = document.getElementById('edit-old-name').value.trim();
-                const res = await fetch('/api/servers/'+encodeURIComponent(oldName), { method:'DELETE' });
-                const d = await res.json(); if(d.status!=='success'){ alert(d.message||'删除失败'); return; }
-                closeModal('modal-edit'); 
-                await refreshStatus();
-            }
-
-            // 添加类型弹窗
-            function openAddTypeModal(){ document.getElementById('modal-add-type').style.display='block'; }
-            async function saveAddType(){
-                const name = document.getElementById('add-name').value.trim();
-                const type = document.getElementById('add-type').value.trim();
-                const command = document.getElementById('add-command').value.trim();
-                const args = document.getElementById('add-args').value.trim();
-                const url = document.getElementById('add-url').value.trim();
-                const envStr = document.getElementById('add-env').value.trim();
-                const disabledStr = document.getElementById('add-disabled').value.trim();
-                if(!name || !type){ alert('名称与类型必填'); return; }
-                let env={}; if(envStr){ try{ env=JSON.parse(envStr); }catch(e){ alert('env需为JSON'); return; } }
-                const payload={ name, type, command, args, url, env, disabled:(disabledStr||'').toLowerCase()==='true' };
-                const res = await fetch('/api/servers', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(payload) });
-                const d = await res.json(); if(d.status!=='success'){ alert(d.message||'添加失败'); return; }
-                closeModal('modal-add-type'); 
-                await refreshStatus();
-            }
-
-            // 添加JSON弹窗
-            function openAddJsonModal(){ document.getElementById('modal-add-json').style.display='block'; }
-            async function saveAddJson(){
-                const txt = document.getElementById('add-json').value;
-                let obj={}; try{ obj=JSON.parse(txt||'{}'); }catch(e){ alert('JSON解析失败'); return; }
-                const res = await fetch('/api/servers/json', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ mcpServers: obj }) });
-                const d = await res.json(); if(d.status!=='success'){ alert(d.message||'合并失败'); return; }
-                closeModal('modal-add-json'); 
-                await refreshStatus();
-            }
-
-            function closeModal(id){ document.getElementById(id).style.display='none'; }
-
-            // 接入点设置功能
-            function openEndpointsModal(){ 
-                document.getElementById('modal-endpoints').style.display='block';
-                loadEndpoints();
-            }
-            
-            async function loadEndpoints(){
-                try {
-                    const res = await fetch('/api/config');
-                    const data = await res.json();
-                    const endpoints = data.mcpEndpoints || {};
-                    const container = document.getElementById('endpoints-list');
-                    container.innerHTML = '';
-                    
-                    Object.keys(endpoints).forEach(name => {
-                        const ep = endpoints[name] || {};
-                        const div = document.createElement('div');
-                        div.style.border = '1px solid #e5e7eb';
-                        div.style.borderRadius = '8px';
-                        div.style.padding = '12px';
-                        div.style.margin = '8px 0';
-                        
-                        const title = document.createElement('div');
-                        title.innerHTML = '<strong>' + name + '</strong>';
-                        
-                        const row = document.createElement('div');
-                        row.className = 'row';
-                        
-                        const nameInput = document.createElement('input');
-                        nameInput.value = name;
-                        nameInput.placeholder = '名称';
-                        nameInput.id = 'ep-name-' + name;
-                        
-                        const urlInput = document.createElement('input');
-                        urlInput.value = ep.url || '';
-                        urlInput.placeholder = 'WebSocket URL';
-                        urlInput.id = 'ep-url-' + name;
-                        
-                        const enabledInput = document.createElement('input');
-                        enabledInput.value = String(!!ep.enabled);
-                        enabledInput.placeholder = 'enabled true|false';
-                        enabledInput.id = 'ep-enabled-' + name;
-                        
-                        row.appendChild(nameInput);
-                        row.appendChild(urlInput);
-                        row.appendChild(enabledInput);
-                        
-                        const btns = document.createElement('div');
-                        btns.className = 'row';
-                        btns.style.marginTop = '8px';
-                        
-                        const saveBtn = document.createElement('button');
-                        saveBtn.textContent = '保存';
-                        saveBtn.onclick = () => saveEndpoint(name, nameInput.value, urlInput.value, enabledInput.value);
-                        
-                        const delBtn = document.createElement('button');
-                        delBtn.textContent = '删除';
-                        delBtn.className = 'stop';
-                        delBtn.onclick = () => deleteEndpoint(name);
-                        
-                        btns.appendChild(saveBtn);
-                        btns.appendChild(delBtn);
-                        
-                        div.appendChild(title);
-                        div.appendChild(row);
-                        div.appendChild(btns);
-                        container.appendChild(div);
-                    });
-                } catch(e) {
-                    alert('加载接入点失败: ' + e);
-                }
-            }
-            
-            async function saveEndpoint(oldName, newName, url, enabledStr){
-                try {
-                    const res = await fetch('/api/config');
-                    const data = await res.json();
-                    const endpoints = data.mcpEndpoints || {};
-                    
-                    if(newName !== oldName) {
-                        // 改名：先添加新的，再删除旧的
-                        endpoints[newName] = {
-                            url: url,
-                            enabled: (enabledStr || '').toLowerCase() === 'true'
-                        };
-                        delete endpoints[oldName];
-                    } else {
-                        // 更新现有
-                        endpoints[oldName] = {
-                            url: url,
-                            enabled: (enabledStr || '').toLowerCase() === 'true'
-                        };
-                    }
-                    
-                    const updateRes = await fetch('/api/config', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ ...data, mcpEndpoints: endpoints })
-                    });
-                    
-                    const result = await updateRes.json();
-                    if(result.status !== 'success') {
-                        alert(result.message || '保存失败');
-                        return;
-                    }
-                    
-                    alert('已保存');
-                    loadEndpoints();
-                    refreshStatus();
-                } catch(e) {
-                    alert('保存失败: ' + e);
-                }
-            }
-            
-            async function deleteEndpoint(name){
-                if(!confirm('确定要删除接入点 "' + name + '" 吗？')) return;
-                
-                try {
-                    const res = await fetch('/api/config');
-                    const data = await res.json();
-                    const endpoints = data.mcpEndpoints || {};
-                    delete endpoints[name];
-                    
-                    const updateRes = await fetch('/api/config', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ ...data, mcpEndpoints: endpoints })
-                    });
-                    
-                    const result = await updateRes.json();
-                    if(result.status !== 'success') {
-                        alert(result.message || '删除失败');
-                        return;
-                    }
-                    
-                    alert('已删除');
-                    loadEndpoints();
-                    refreshStatus();
-                } catch(e) {
-                    alert('删除失败: ' + e);
-                }
-            }
-            
-            async function addNewEndpoint(){
-                const name = document.getElementById('new-ep-name').value.trim();
-                const url = document.getElementById('new-ep-url').value.trim();
-                const enabledStr = document.getElementById('new-ep-enabled').value.trim();
-                
-                if(!name || !url) {
-                    alert('名称和URL必填');
-                    return;
-                }
-                
-                try {
-                    const res = await fetch('/api/config');
-                    const data = await res.json();
-                    const endpoints = data.mcpEndpoints || {};
-                    
-                    if(endpoints[name]) {
-                        alert('接入点 "' + name + '" 已存在');
-                        return;
-                    }
-                    
-                    endpoints[name] = {
-                        url: url,
-                        enabled: (enabledStr || '').toLowerCase() === 'true'
-                    };
-                    
-                    const updateRes = await fetch('/api/config', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ ...data, mcpEndpoints: endpoints })
-                    });
-                    
-                    const result = await updateRes.json();
-                    if(result.status !== 'success') {
-                        alert(result.message || '添加失败');
-                        return;
-                    }
-                    
-                    alert('已添加');
-                    document.getElementById('new-ep-name').value = '';
-                    document.getElementById('new-ep-url').value = '';
-                    document.getElementById('new-ep-enabled').value = '';
-                    loadEndpoints();
-                    refreshStatus();
-                } catch(e) {
-                    alert('添加失败: ' + e);
-                }
-            }
-
-            // 初始化：进入页面即加载状态
-            document.addEventListener('DOMContentLoaded', ()=>{ refreshStatus(); });
-
-        </script>
+        <script src="{{ app_js }}"></script>
 
         <!-- 弹窗：编辑服务器 -->
         <div id="modal-edit" style="display:none; position:fixed; inset:0; background: rgba(0,0,0,0.35); z-index:1000;">
@@ -1034,128 +1235,372 @@ def create_app():
     </body>
     </html>
     """
+    # Front-end files from STATIC_DIR, served under content-hashed names so browsers
+    # can cache them indefinitely and still pick up a changed file on the next page load.
+    assets = {}
+
+    def minify_asset(body, mimetype):
+        """Drop comments and indentation from CSS/JS. Line breaks are kept, so JS semicolon
+        insertion is unaffected; app.js has no template literals, so no string spans lines."""
+        if mimetype == 'text/css':
+            body = re.sub(rb'/\*.*?\*/', b'', body, flags=re.S)
+        lines = (line.strip() for line in body.splitlines())
+        return b'\n'.join(line for line in lines if line and not line.startswith(b'//'))
+
+    def register_asset(filename, mimetype):
+        """Load a static file into memory (minified) and return its hashed URL."""
+        with open(os.path.join(STATIC_DIR, filename), 'rb') as f:
+            body = minify_asset(f.read(), mimetype)
+        stem, ext = os.path.splitext(filename)
+        hashed = f"{stem}.{hashlib.sha256(body).hexdigest()[:8]}{ext}"
+        assets[hashed] = (body, mimetype)
+        return f"/assets/{hashed}"
+
+    @app.get('/assets/<name>')
+    def asset(name):  # type: ignore
+        found = assets.get(name)
+        if found is None:
+            return '', 404
+        body, mimetype = found
+        resp = app.response_class(body, mimetype=mimetype)
+        resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return resp
+
+    # The page has no server-side data (everything comes from /api/dashboard),
+    # so render it once and let browsers revalidate against a content hash.
+    index_body = app.jinja_env.from_string(INDEX_HTML).render(
+        app_css=register_asset('app.css', 'text/css'),
+        app_js=register_asset('app.js', 'application/javascript'),
+    ).encode('utf-8')
+    index_etag = hashlib.blake2b(index_body, digest_size=16).hexdigest()
 
     @app.get('/')
     def index():  # type: ignore
-        return render_template_string(INDEX_HTML)
+        if index_etag in request.if_none_match:
+            return '', 304
+        resp = app.response_class(index_body, mimetype='text/html')
+        resp.set_etag(index_etag)
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
+
+    def build_status_view(data):
+        """Copy of the status with the badge class/text each entry is rendered with, so the page only substitutes strings."""
+        tools = {}
+        for name, entry in (data.get('tools') or {}).items():
+            status = entry.get('status')
+            tools[name] = {**entry, 'badge_class': TOOL_BADGE_CLASSES.get(status, 'status-stopped'), 'status_text': status or '未运行'}
+        endpoints = {}
+        for name, entry in (data.get('endpoints') or {}).items():
+            connected = bool(entry.get('connected'))
+            endpoints[name] = {
+                **entry,
+                'badge_class': 'status-connected' if connected else 'status-disconnected',
+                'status_text': '已连接' if connected else '未连接',
+            }
+        return {'endpoints': endpoints, 'tools': tools}
+
+    # (generation, status view, metrics) for the last status snapshot, swapped in as one tuple
+    status_projection = [(None, None, None)]
+
+    def projected_status():
+        """Status view and metrics for the current snapshot, rebuilt only when the status file changes."""
+        data, generation = read_status_snapshot()
+        cached = status_projection[0]
+        if cached[0] == generation:
+            return cached
+        cached = (generation, build_status_view(data), compute_metrics(data))
+        status_projection[0] = cached
+        return cached
+
+    def stream_status(data):
+        """Yield the status JSON one entry at a time instead of encoding the whole body up front."""
+        yield b'{'
+        for i, section in enumerate(('endpoints', 'tools')):
+            yield (b',' if i else b'') + json_dumps(section) + b':{'
+            for j, (name, entry) in enumerate((data.get(section) or {}).items()):
+                yield (b',' if j else b'') + json_dumps(name) + b':' + json_dumps(entry)
+            yield b'}'
+        yield b'}'
 
     @app.get('/api/status')
     def api_status():  # type: ignore
         try:
-            if not os.path.exists(STATUS_FILE):
-                return jsonify({"endpoints": {}, "tools": {}})
-            with open(STATUS_FILE, 'r', encoding='utf-8') as f:
-                return jsonify(json.load(f))
+            etag, view, _ = projected_status()
+            if etag in request.if_none_match:
+                return '', 304
+            resp = app.response_class(stream_status(view), mimetype='application/json')
+            resp.set_etag(etag)
+            resp.headers['Cache-Control'] = 'no-cache'
+            return resp
         except Exception as e:
-            return jsonify({"error": str(e)}), 500
+            web_logger.exception("读取状态失败")
+            return json_response({"error": str(e)}), 500
+
+    config_bodies = {}
+
+    def config_body(view):
+        """Encoded config view and its ETag; re-encoded only after the config file changes."""
+        data = _cached_config()
+        hit = config_bodies.get(view)
+        if hit is not None and hit[0] is data:
+            return hit[1], hit[2]
+        body = json_dumps(data if view == 'config' else {"servers": data['mcpServers']})
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        config_bodies[view] = (data, body, etag)
+        return body, etag
 
     @app.get('/api/config')
     def api_config_get():  # type: ignore
         try:
-            cfg = load_config()
-            return jsonify(cfg)
+            return etag_json_response(*config_body('config'))
         except Exception as e:
-            return jsonify({"error": str(e)}), 500
+            web_logger.exception("读取配置失败")
+            return json_response({"error": str(e)}), 500
 
     @app.post('/api/config')
+    @config_transaction
     def api_config_post():  # type: ignore
         try:
-            data = request.get_json(force=True, silent=True) or {}
-            if not isinstance(data, dict):
-                return jsonify({"status": "error", "message": "配置必须是 JSON 对象"}), 400
+            data, error = read_body('config')
+            if error:
+                return error
             # 仅保留已知字段，防止写入多余键
             safe = {
                 "mcpServers": data.get("mcpServers", {}),
                 "mcpEndpoints": data.get("mcpEndpoints", {})
             }
-            path = os.environ.get("MCP_CONFIG") or os.path.join(os.getcwd(), "mcp_config.json")
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(safe, f, indent=2, ensure_ascii=False)
-            return jsonify({"status": "success", "message": "配置已保存"})
+            err = validate_config(safe, previous=_cached_config())
+            if err:
+                return json_response({"status": "error", "message": err}), 400
+            save_config(safe)
+            return success_response("配置已保存")
         except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+            web_logger.exception("保存配置失败")
+            return json_response({"status": "error", "message": str(e)}), 500
 
     @app.post('/api/restart')
     def api_restart():  # type: ignore
         try:
-            # 非阻塞地调用 stop/start（仅影响后端 mcp_pipe 子进程，不影响本 Web 进程）
-            subprocess.Popen([sys.executable, 'mcptool.py', 'stop'])
-            # 稍作延时后再启动
-            subprocess.Popen([sys.executable, 'mcptool.py', 'start'])
-            return jsonify({"status": "success", "message": "已触发重启（stop->start）"})
+            # 仅重启后端 mcp_pipe 子进程，不影响本 Web 进程
+            stop_pipe_process()
+            start_pipe_process()
+            return success_response("已触发重启（stop->start）")
         except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+            web_logger.exception("重启服务失败")
+            return json_response({"status": "error", "message": str(e)}), 500
 
     @app.get('/api/metrics')
     def api_metrics():  # type: ignore
         try:
-            status = {}
-            if os.path.exists(STATUS_FILE):
-                with open(STATUS_FILE, 'r', encoding='utf-8') as f:
-                    status = json.load(f)
-            tools_map = status.get('tools', {}) if isinstance(status, dict) else {}
-            endpoints_map = status.get('endpoints', {}) if isinstance(status, dict) else {}
-            num_servers = len(tools_map)
-            num_endpoints = len(endpoints_map)
-            total_tools = 0
-            for s in tools_map.values():
-                arr = (s or {}).get('tools', [])
-                if isinstance(arr, list):
-                    total_tools += len(arr)
-            return jsonify({
-                'num_servers': num_servers,
-                'num_endpoints': num_endpoints,
-                'total_tools': total_tools
-            })
+            return json_response(projected_status()[2])
         except Exception as e:
-            return jsonify({'error': str(e)}), 500
+            web_logger.exception("统计指标失败")
+            return json_response({'error': str(e)}), 500
+
+    def compute_metrics(status):
+        tools_map = status.get('tools', {}) if isinstance(status, dict) else {}
+        endpoints_map = status.get('endpoints', {}) if isinstance(status, dict) else {}
+        total_tools = 0
+        running_servers = 0
+        for s in tools_map.values():
+            s = s or {}
+            arr = s.get('tools', [])
+            if isinstance(arr, list):
+                total_tools += len(arr)
+            if s.get('status') == '运行中':
+                running_servers += 1
+        return {
+            'num_servers': len(tools_map),
+            'running_servers': running_servers,
+            'num_endpoints': len(endpoints_map),
+            'total_tools': total_tools
+        }
 
     @app.get('/api/service')
     def api_service():  # type: ignore
         try:
-            # 重用 mcptool.py 的 pid 文件约定
-            pid_path = os.path.join(os.getcwd(), '.mcp_pid')
-            running = False
-            if os.path.exists(pid_path):
+            return json_response({ 'running': is_service_running() })
+        except Exception as e:
+            web_logger.exception("查询服务状态失败")
+            return json_response({ 'error': str(e) }), 500
+
+    # Encoded dashboard for the last (status generation, service running) pair; every poller
+    # and push subscriber shares it until one of the two changes
+    dashboard_cache = {'key': None, 'body': None, 'etag': None}
+    dashboard_lock = threading.Lock()
+
+    def dashboard_body():
+        """(JSON bytes, ETag) of everything the dashboard refresh needs, from one status read."""
+        generation, view, metrics = projected_status()
+        running = is_service_running()
+        key = (generation, running)
+        with dashboard_lock:
+            if dashboard_cache['key'] != key:
+                body = json_dumps({
+                    'service': {'running': running},
+                    'metrics': metrics,
+                    'status': view
+                })
+                dashboard_cache.update(key=key, body=body,
+                                       etag=hashlib.blake2b(body, digest_size=8).hexdigest())
+            return dashboard_cache['body'], dashboard_cache['etag']
+
+    @app.get('/api/dashboard')
+    def api_dashboard():  # type: ignore
+        try:
+            body, etag = dashboard_body()
+            return etag_json_response(body, etag)
+        except Exception as e:
+            web_logger.exception("获取仪表盘数据失败")
+            return json_response({'error': str(e)}), 500
+
+    # Server-sent events: a single watcher rebuilds the dashboard payload and pushes it to
+    # every open page only when it changed, so idle pages cost nothing per client.
+    event_subscribers = set()
+    event_lock = threading.Lock()
+    watcher = {'thread': None}
+
+    def publish(q, payload):
+        """Hand the latest payload to a subscriber, replacing one it has not picked up yet."""
+        try:
+            q.put_nowait(payload)
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+            q.put_nowait(payload)
+
+    def watch_dashboard():
+        last = None
+        while True:
+            time.sleep(EVENT_POLL_INTERVAL)
+            with event_lock:
+                if not event_subscribers:
+                    # Nobody is watching; the next subscriber starts a fresh watcher
+                    watcher['thread'] = None
+                    return
+            try:
+                payload, _ = dashboard_body()
+            except Exception:
+                web_logger.exception("刷新仪表盘推送失败")
+                continue
+            if payload == last:
+                continue
+            last = payload
+            with event_lock:
+                targets = list(event_subscribers)
+            for q in targets:
+                publish(q, payload)
+
+    def ensure_watcher():
+        """Start the watcher with the first subscriber; it exits again once the last one leaves.
+
+        Called with event_lock held.
+        """
+        if watcher['thread'] is None:
+            watcher['thread'] = threading.Thread(target=watch_dashboard, name='mcp-web-events', daemon=True)
+            watcher['thread'].start()
+
+    def subscribe():
+        """Register a new subscriber queue, or return None when too many are open."""
+        q = queue.Queue(maxsize=1)
+        with event_lock:
+            # Each open stream or pending long poll holds a server thread; keep some for regular requests
+            if len(event_subscribers) >= max(1, WEB_THREADS - 2):
+                return None
+            event_subscribers.add(q)
+            ensure_watcher()
+        return q
+
+    @app.get('/api/events')
+    def api_events():  # type: ignore
+        q = subscribe()
+        if q is None:
+            return json_response({'error': '推送连接数过多'}), 503
+
+        def stream():
+            try:
+                yield b'event: status\ndata: ' + dashboard_body()[0] + b'\n\n'
+                while True:
+                    try:
+                        yield b'event: status\ndata: ' + q.get(timeout=EVENT_KEEPALIVE) + b'\n\n'
+                    except queue.Empty:
+                        # Comment line; lets the server notice closed connections
+                        yield b': keepalive\n\n'
+            finally:
+                with event_lock:
+                    event_subscribers.discard(q)
+
+        resp = app.response_class(stream(), mimetype='text/event-stream')
+        resp.headers['Cache-Control'] = 'no-cache'
+        resp.headers['X-Accel-Buffering'] = 'no'
+        return resp
+
+    @app.get('/api/dashboard/wait')
+    def api_dashboard_wait():  # type: ignore
+        """Long-poll fallback for /api/events: answers once the dashboard differs from the
+        client's If-None-Match, or with 304 after EVENT_LONG_POLL_TIMEOUT."""
+        try:
+            body, etag = dashboard_body()
+            if etag in request.if_none_match:
+                q = subscribe()
+                if q is None:
+                    return json_response({'error': '推送连接数过多'}), 503
                 try:
-                    with open(pid_path, 'r') as f:
-                        pid = int(f.read().strip())
-                    import psutil
-                    psutil.Process(pid)
-                    running = True
-                except Exception:
-                    running = False
-            return jsonify({ 'running': running })
+                    deadline = time.monotonic() + EVENT_LONG_POLL_TIMEOUT
+                    while etag in request.if_none_match:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        try:
+                            q.get(timeout=remaining)
+                        except queue.Empty:
+                            break
+                        # A fresh watcher pushes the current payload first; only a new ETag ends the wait
+                        body, etag = dashboard_body()
+                finally:
+                    with event_lock:
+                        event_subscribers.discard(q)
+            return etag_json_response(body, etag)
         except Exception as e:
-            return jsonify({ 'error': str(e) }), 500
+            web_logger.exception("获取仪表盘数据失败")
+            return json_response({'error': str(e)}), 500
 
     @app.post('/api/start')
     def api_start():  # type: ignore
         try:
-            subprocess.Popen([sys.executable, 'mcptool.py', 'start'])
-            return jsonify({ 'status': 'success', 'message': '已请求启动' })
+            if start_pipe_process() is None:
+                return success_response("MCP服务已在运行中")
+            return success_response("已请求启动")
         except Exception as e:
-            return jsonify({ 'status': 'error', 'message': str(e) }), 500
+            web_logger.exception("启动服务失败")
+            return json_response({ 'status': 'error', 'message': str(e) }), 500
 
     @app.post('/api/stop')
     def api_stop():  # type: ignore
         try:
-            subprocess.Popen([sys.executable, 'mcptool.py', 'stop'])
-            return jsonify({ 'status': 'success', 'message': '已请求停止' })
+            if not stop_pipe_process():
+                return success_response("MCP服务未在运行")
+            return success_response("已停止")
         except Exception as e:
-            return jsonify({ 'status': 'error', 'message': str(e) }), 500
+            web_logger.exception("停止服务失败")
+            return json_response({ 'status': 'error', 'message': str(e) }), 500
 
     @app.put('/api/servers/<name>')
+    @config_transaction
     def api_servers_update(name):  # type: ignore
         try:
             if not name:
-                return jsonify({"status": "error", "message": "缺少名称"}), 400
-            body = request.get_json(force=True, silent=True) or {}
-            cfg = load_config() or {}
-            servers = dict(cfg.get('mcpServers', {}))
+                return json_response({"status": "error", "message": "缺少名称"}), 400
+            body, error = read_body('server_update')
+            if error:
+                return error
+            cfg = load_config()
+            servers = cfg['mcpServers']
             if name not in servers:
-                return jsonify({"status": "error", "message": f"服务器 {name} 不存在"}), 404
-            entry = servers[name] or {}
+                return json_response({"status": "error", "message": f"服务器 {name} 不存在"}), 404
+            entry = servers[name]
             # 允许更新的字段
             if 'type' in body: entry['type'] = (body.get('type') or '').strip()
             if 'command' in body: entry['command'] = (body.get('command') or '').strip()
@@ -1164,42 +1609,44 @@ def create_app():
                 if isinstance(raw_args, list):
                     entry['args'] = raw_args
                 elif isinstance(raw_args, str):
-                    entry['args'] = raw_args.strip().split() if raw_args.strip() else []
+                    try:
+                        entry['args'] = shlex.split(raw_args)
+                    except ValueError:
+                        return json_response({"status": "error", "message": "args 格式错误（引号未闭合）"}), 400
             if 'url' in body: entry['url'] = (body.get('url') or '').strip()
             if 'env' in body and isinstance(body.get('env'), dict): entry['env'] = body.get('env')
             if 'disabled' in body: entry['disabled'] = bool(body.get('disabled'))
             servers[name] = entry
-            new_cfg = {
-                'mcpServers': servers,
-                'mcpEndpoints': (cfg.get('mcpEndpoints') or {})
-            }
-            path = os.environ.get('MCP_CONFIG') or os.path.join(os.getcwd(), 'mcp_config.json')
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(new_cfg, f, indent=2, ensure_ascii=False)
-            return jsonify({"status": "success", "message": f"服务器 {name} 已更新"})
+            err = validate_servers({name: entry})
+            if err:
+                return json_response({"status": "error", "message": err}), 400
+            save_config(cfg)
+            return json_response({"status": "success", "message": f"服务器 {name} 已更新"})
         except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+            web_logger.exception("更新服务器失败")
+            return json_response({"status": "error", "message": str(e)}), 500
 
     @app.get('/api/servers')
     def api_servers_get():  # type: ignore
         try:
-            cfg = load_config() or {}
-            return jsonify({"servers": cfg.get("mcpServers", {})})
+            return etag_json_response(*config_body('servers'))
         except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+            web_logger.exception("读取服务器列表失败")
+            return json_response({"status": "error", "message": str(e)}), 500
 
     @app.post('/api/servers')
+    @config_transaction
     def api_servers_add():  # type: ignore
         try:
-            body = request.get_json(force=True, silent=True) or {}
-            name = (body.get('name') or '').strip()
-            typ = (body.get('type') or '').strip().lower()
-            if not name or not typ:
-                return jsonify({"status": "error", "message": "name 与 type 必填"}), 400
-            cfg = load_config() or {}
-            servers = dict(cfg.get('mcpServers', {}))
+            body, error = read_body('server_add')
+            if error:
+                return error
+            name = body['name'].strip()
+            typ = body['type'].strip().lower()
+            cfg = load_config()
+            servers = cfg['mcpServers']
             if name in servers:
-                return jsonify({"status": "error", "message": f"服务器 {name} 已存在"}), 400
+                return json_response({"status": "error", "message": f"服务器 {name} 已存在"}), 400
             entry = {"type": typ}
             if 'disabled' in body: entry['disabled'] = bool(body.get('disabled'))
             env = body.get('env') or {}
@@ -1207,78 +1654,163 @@ def create_app():
             if typ == 'stdio':
                 cmd = (body.get('command') or '').strip()
                 if not cmd:
-                    return jsonify({"status": "error", "message": "stdio 类型需提供 command"}), 400
+                    return json_response({"status": "error", "message": "stdio 类型需提供 command"}), 400
                 entry['command'] = cmd
                 raw_args = body.get('args')
                 if isinstance(raw_args, list):
                     entry['args'] = raw_args
-                elif isinstance(raw_args, str) and raw_args.strip():
-                    entry['args'] = raw_args.strip().split()
+                elif isinstance(raw_args, str):
+                    try:
+                        entry['args'] = shlex.split(raw_args)
+                    except ValueError:
+                        return json_response({"status": "error", "message": "args 格式错误（引号未闭合）"}), 400
                 else:
                     entry['args'] = []
             elif typ in ('sse', 'http', 'streamablehttp'):
                 url = (body.get('url') or '').strip()
                 if not url:
-                    return jsonify({"status": "error", "message": f"{typ} 类型需提供 url"}), 400
+                    return json_response({"status": "error", "message": f"{typ} 类型需提供 url"}), 400
                 entry['url'] = url
             else:
-                return jsonify({"status": "error", "message": f"不支持的类型: {typ}"}), 400
+                return json_response({"status": "error", "message": f"不支持的类型: {typ}"}), 400
             servers[name] = entry
-            new_cfg = {
-                "mcpServers": servers,
-                "mcpEndpoints": (cfg.get('mcpEndpoints') or {})
-            }
-            path = os.environ.get("MCP_CONFIG") or os.path.join(os.getcwd(), "mcp_config.json")
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(new_cfg, f, indent=2, ensure_ascii=False)
-            return jsonify({"status": "success", "message": f"服务器 {name} 已添加"})
+            err = validate_servers({name: entry})
+            if err:
+                return json_response({"status": "error", "message": err}), 400
+            save_config(cfg)
+            return json_response({"status": "success", "message": f"服务器 {name} 已添加"})
         except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+            web_logger.exception("添加服务器失败")
+            return json_response({"status": "error", "message": str(e)}), 500
 
     @app.post('/api/servers/json')
+    @config_transaction
     def api_servers_add_json():  # type: ignore
         try:
-            body = request.get_json(force=True, silent=True) or {}
-            incoming = body.get('mcpServers') or {}
-            if not isinstance(incoming, dict):
-                return jsonify({"status": "error", "message": "mcpServers 必须为对象"}), 400
-            cfg = load_config() or {}
-            servers = dict(cfg.get('mcpServers', {}))
-            servers.update(incoming)
-            new_cfg = {
-                "mcpServers": servers,
-                "mcpEndpoints": (cfg.get('mcpEndpoints') or {})
-            }
-            path = os.environ.get("MCP_CONFIG") or os.path.join(os.getcwd(), "mcp_config.json")
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(new_cfg, f, indent=2, ensure_ascii=False)
-            return jsonify({"status": "success", "message": "mcpServers 已合并"})
+            body, error = read_body('server_merge')
+            if error:
+                return error
+            incoming = body['mcpServers']
+            # Only the imported entries are new; reject a bad one before touching the config
+            err = validate_servers(incoming)
+            if err:
+                return json_response({"status": "error", "message": err}), 400
+            cfg = load_config()
+            cfg['mcpServers'].update(incoming)
+            save_config(cfg)
+            return success_response("mcpServers 已合并")
         except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+            web_logger.exception("合并服务器配置失败")
+            return json_response({"status": "error", "message": str(e)}), 500
 
     @app.delete('/api/servers/<name>')
+    @config_transaction
     def api_servers_delete(name):  # type: ignore
         try:
             if not name:
-                return jsonify({"status": "error", "message": "缺少名称"}), 400
-            cfg = load_config() or {}
-            servers = dict(cfg.get('mcpServers', {}))
+                return json_response({"status": "error", "message": "缺少名称"}), 400
+            cfg = load_config()
+            servers = cfg['mcpServers']
             if name not in servers:
-                return jsonify({"status": "error", "message": f"服务器 {name} 不存在"}), 404
+                return json_response({"status": "error", "message": f"服务器 {name} 不存在"}), 404
+            # Removing an entry cannot make the rest invalid; nothing to validate
             del servers[name]
-            new_cfg = {
-                "mcpServers": servers,
-                "mcpEndpoints": (cfg.get('mcpEndpoints') or {})
-            }
-            path = os.environ.get("MCP_CONFIG") or os.path.join(os.getcwd(), "mcp_config.json")
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(new_cfg, f, indent=2, ensure_ascii=False)
-            return jsonify({"status": "success", "message": f"服务器 {name} 已删除"})
+            save_config(cfg)
+            return json_response({"status": "success", "message": f"服务器 {name} 已删除"})
         except Exception as e:
-            return jsonify({"status": "error", "message": str(e)}), 500
+            web_logger.exception("删除服务器失败")
+            return json_response({"status": "error", "message": str(e)}), 500
 
     return app
 
+# Web UI server settings; handlers mostly wait on small file reads
+WEB_THREADS = int(os.environ.get('MCP_WEB_THREADS', '8'))
+# Dashboard push (/api/events): how often the payload is rebuilt, and the idle keepalive
+EVENT_POLL_INTERVAL = 1.0
+EVENT_KEEPALIVE = 15.0
+# Longest a /api/dashboard/wait request is held open; below WEB_CHANNEL_TIMEOUT
+EVENT_LONG_POLL_TIMEOUT = 25.0
+WEB_CHANNEL_TIMEOUT = int(os.environ.get('MCP_WEB_CHANNEL_TIMEOUT', '30'))
+# Open (keep-alive) connections accepted per process before waitress stops accepting
+WEB_CONNECTION_LIMIT = int(os.environ.get('MCP_WEB_CONNECTION_LIMIT', '200'))
+
+# Extra web processes sharing the port via SO_REUSEPORT (POSIX only); 1 keeps a single process
+WEB_WORKERS = int(os.environ.get('MCP_WEB_WORKERS', '1'))
+# 0 in the parent web process, 1..WEB_WORKERS-1 in the workers fork_web_workers() starts
+WEB_WORKER_INDEX = 0
+
+def fork_web_workers(host='0.0.0.0', port=6789):
+    """Fork WEB_WORKERS processes that each listen on host:port with SO_REUSEPORT.
+
+    Returns the listening socket for the calling process, or None when running a single
+    process (the default, or a platform without SO_REUSEPORT/fork). Call it before
+    create_app(): background threads started there do not survive fork().
+    """
+    if WEB_WORKERS <= 1 or not hasattr(socket, 'SO_REUSEPORT') or not hasattr(os, 'fork'):
+        return None
+    if os.environ.get('MCP_DEBUG', '0').strip().lower() in ('1', 'true', 'yes'):
+        return None
+    try:
+        import waitress  # noqa: F401  (only waitress can serve on a pre-bound socket)
+    except ImportError:
+        return None
+    global WEB_WORKER_INDEX
+    parent = os.getpid()
+    children = []
+    for index in range(1, WEB_WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            WEB_WORKER_INDEX = index
+            children = None
+            break
+        children.append(pid)
+    if children:
+        # The PID file only records this process; take the workers down with it
+        def stop_children(*_):
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+        atexit.register(stop_children)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    elif children is None:
+        # Only the parent is in the PID file: if it dies without stop_children (SIGKILL),
+        # don't keep serving as an orphan nobody can stop
+        def watch_parent():
+            while os.getppid() == parent:
+                time.sleep(1)
+            os.kill(os.getpid(), signal.SIGTERM)
+        threading.Thread(target=watch_parent, name="web-parent-watch", daemon=True).start()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+def serve_app(app, host='0.0.0.0', port=6789, sock=None):
+    """Serve the web app with the waitress WSGI server, falling back to Flask's threaded server.
+
+    Set MCP_DEBUG=1 to opt in to Flask's debug server (reloader + debugger) during development.
+    sock is a pre-bound listening socket from fork_web_workers().
+    """
+    if os.environ.get('MCP_DEBUG', '0').strip().lower() in ('1', 'true', 'yes'):
+        app.run(host=host, port=port, debug=True)
+        return
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("waitress 未安装，使用 Flask 内置服务器运行 Web")
+        app.run(host=host, port=port, threaded=True)
+        return
+    if sock is not None:
+        serve(app, sockets=[sock], threads=WEB_THREADS, channel_timeout=WEB_CHANNEL_TIMEOUT,
+              connection_limit=WEB_CONNECTION_LIMIT)
+        return
+    serve(app, host=host, port=port, threads=WEB_THREADS, channel_timeout=WEB_CHANNEL_TIMEOUT,
+          connection_limit=WEB_CONNECTION_LIMIT)
+
 if __name__ == "__main__":
     # 初始化状态文件
     init_status_file()
@@ -1295,15 +1827,12 @@ if __name__ == "__main__":
     async def _main():
         if not target_arg:
             cfg = load_config()
-            servers_cfg = (cfg.get("mcpServers") or {})
-            endpoints_cfg = (cfg.get("mcpEndpoints") or {})
-
-            enabled_servers = [name for name, entry in servers_cfg.items() if not (entry or {}).get("disabled")]
-            enabled_endpoints = {name: ep for name, ep in endpoints_cfg.items() if (ep or {}).get('enabled', True) and ep.get('url')}
+            enabled_servers = [name for name, server in server_configs(cfg).items() if not server.disabled]
+            enabled_endpoints = {ep.name: ep for ep in get_enabled_endpoints()}
 
             # Control whether to connect to all endpoints or only a primary one
             # Priority: explicit flag in mcp_config.json, then environment variable MCP_CONNECT_ALL
-            cfg_for_flag = cfg if isinstance(cfg, dict) else {}
+            cfg_for_flag = cfg
             connect_all_flag = None
             try:
                 # allow several key names for backward/forward compatibility
@@ -1341,7 +1870,7 @@ if __name__ == "__main__":
                 if not first_ep:
                     raise RuntimeError("No enabled mcpEndpoints found in config and MCP_ENDPOINT not set")
                 ep_name, ep = first_ep
-                url = ep.get('url')
+                url = ep.url
                 logger.info(f"MCP_CONNECT_ALL disabled: connecting all servers to single endpoint '{ep_name}'")
                 for server_name in enabled_servers:
                     target = f"{server_name}::{ep_name}"
@@ -1357,7 +1886,7 @@ if __name__ == "__main__":
                 pending = []
                 for server_name in enabled_servers:
                     for ep_name in ep_names:
-                        url = enabled_endpoints[ep_name].get('url')
+                        url = enabled_endpoints[ep_name].url
                         target = f"{server_name}::{ep_name}"
                         pending.append((url, target))
 
@@ -1376,9 +1905,7 @@ if __name__ == "__main__":
             if os.path.exists(target_arg):
                 # Prefer env endpoint; if missing, try the first enabled endpoint in config
                 if not endpoint_url:
-                    cfg = load_config()
-                    endpoints_cfg = (cfg.get("mcpEndpoints") or {})
-                    first_enabled = next((ep.get('url') for ep in endpoints_cfg.values() if (ep or {}).get('enabled', True) and ep.get('url')), None)
+                    first_enabled = next((ep.url for ep in get_enabled_endpoints()), None)
                     if not first_enabled:
                         raise RuntimeError("未找到可用端点：未设置 MCP_ENDPOINT 且配置中无启用端点")
                     endpoint_url_to_use = first_enabled
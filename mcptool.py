@@ -3,53 +3,91 @@ import subprocess
 import os
 import sys
 import json
+import re
+import shlex
 import signal
+import stat
 import psutil
+try:
+    import orjson  # faster JSON (de)serialization; stdlib json is the fallback
+except ImportError:
+    orjson = None
 
 PID_FILE = os.path.join(os.getcwd(), ".mcp_pid")
 WEB_PID_FILE = os.path.join(os.getcwd(), ".mcp_web_pid")
 CONFIG_PATH = os.path.join(os.getcwd(), "mcp_config.json")
 
+def write_file_atomic(path, data):
+    """先写同目录临时文件再替换，中途出错也不会留下截断的文件；保留原文件的权限（如 .env 的 0600）"""
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = None
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        # 临时文件一创建就使用原文件的权限，写入期间内容不会对其他用户可见
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666 if mode is None else mode)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def load_config():
+    """读取配置文件，文件不存在时返回None"""
+    try:
+        with open(CONFIG_PATH, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def save_config(config):
+    """写入配置文件（原子替换，Web 进程不会读到写了一半的文件）"""
+    if orjson is not None:
+        data = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(config, indent=2, ensure_ascii=False).encode("utf-8")
+    write_file_atomic(CONFIG_PATH, data)
+
+def pid_file_alive(path):
+    """PID文件中记录的进程是否存活（文件不存在或内容无效时为False）"""
+    try:
+        with open(path, "r") as f:
+            pid = int(f.read().strip())
+    except (ValueError, OSError):
+        return False
+    # POSIX 上 pid_exists 只是一次 kill(pid, 0)，不像 psutil.Process 那样读取 /proc
+    return psutil.pid_exists(pid)
+
 def is_server_running():
     """检查服务器是否在运行"""
-    if not os.path.exists(PID_FILE):
-        return False
+    return pid_file_alive(PID_FILE)
 
 def is_web_running():
     """检查Web是否在运行"""
-    if not os.path.exists(WEB_PID_FILE):
-        return False
-    try:
-        with open(WEB_PID_FILE, "r") as f:
-            pid = int(f.read().strip())
-        psutil.Process(pid)
-        return True
-    except (psutil.NoSuchProcess, ValueError, IOError):
-        return False
+    return pid_file_alive(WEB_PID_FILE)
+
+def spawn_background(cmd):
+    """后台启动子进程：使用独立会话（终端里的 Ctrl+C 不会波及），不继承标准输入和多余的文件描述符"""
+    return subprocess.Popen(cmd, env=os.environ.copy(), stdin=subprocess.DEVNULL,
+                            close_fds=True, start_new_session=True)
 
 def start_web_process(port: int):
     """后台启动 Web 界面 (Flask) 并记录PID，避免阻塞。"""
     if is_web_running():
         return None
-    # 使用 Flask CLI 运行 mcp_pipe:create_app，避免导入副作用
-    env = os.environ.copy()
-    env['FLASK_APP'] = 'mcp_pipe:create_app'
-    env['FLASK_RUN_HOST'] = '0.0.0.0'
-    env['FLASK_RUN_PORT'] = str(port)
-    # 关闭自动重载，防止生成子进程难以管理
-    env['FLASK_RUN_FROM_CLI'] = 'false'
-    cmd = [sys.executable, '-m', 'flask', 'run', '--no-reload']
-    proc = subprocess.Popen(cmd, env=env)
-    with open(WEB_PID_FILE, "w") as f:
-        f.write(str(proc.pid))
+    # 通过 `mcptool.py web` 在 WSGI 服务器中运行，而不是 Flask 单线程开发服务器
+    cmd = [sys.executable, os.path.abspath(__file__), 'web', '--port', str(port)]
+    proc = spawn_background(cmd)
+    write_file_atomic(WEB_PID_FILE, str(proc.pid).encode())
     return proc.pid
-    try:
-        with open(PID_FILE, "r") as f:
-            pid = int(f.read().strip())
-        psutil.Process(pid)
-        return True
-    except (psutil.NoSuchProcess, ValueError, IOError):
-        return False
 
 @click.group()
 def cli():
@@ -74,36 +112,30 @@ def start(endpoint, server):
     # 如果提供了endpoint，更新环境变量
     if endpoint:
         env_path = os.path.join(os.getcwd(), ".env")
-        env_lines = []
+        text = ""
         if os.path.exists(env_path):
-            with open(env_path, "r") as f:
-                env_lines = f.readlines()
-        
-        with open(env_path, "w") as f:
-            found = False
-            for line in env_lines:
-                if line.startswith("MCP_ENDPOINT="):
-                    f.write(f"MCP_ENDPOINT={endpoint}\n")
-                    found = True
-                else:
-                    f.write(line)
-            if not found:
-                f.write(f"MCP_ENDPOINT={endpoint}\n")
+            # newline="" 保留原有换行符，沿用文件自己的换行风格（CRLF/LF）
+            with open(env_path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+        newline = "\r\n" if "\r\n" in text else "\n"
+        line = f"MCP_ENDPOINT={endpoint}"
+        text, found = re.subn(r"^MCP_ENDPOINT=[^\r\n]*", lambda m: line, text, flags=re.M)
+        if not found:
+            if text and not text.endswith("\n"):
+                text += newline
+            text += line + newline
+        write_file_atomic(env_path, text.encode("utf-8"))
     
-    # 构建启动命令
-    cmd = ["python", "mcp_pipe.py"]
+    # 构建启动命令：使用当前解释器（虚拟环境中也不会选错 python），脚本与本文件同目录
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_pipe.py")]
     if server:
         cmd.append(server)
     
-    # Prepare environment for child process; do not override MCP_CONNECT_ALL here.
+    # 启动进程；子进程继承当前环境，这里不覆盖 MCP_CONNECT_ALL。
     # Whether连接所有端点由 mcp_config.json 的 connect_all_endpoints 决定，
     # 环境变量仅在未配置时作为后备。
-    child_env = os.environ.copy()
-
-    # 启动进程
-    process = subprocess.Popen(cmd, env=child_env)
-    with open(PID_FILE, "w") as f:
-        f.write(str(process.pid))
+    process = spawn_background(cmd)
+    write_file_atomic(PID_FILE, str(process.pid).encode())
     
     click.echo(f"MCP服务已启动，PID: {process.pid}")
     # 自动启动 Web（后台）
@@ -153,10 +185,12 @@ def status():
 def web(port):
     """启动Web管理界面"""
     # Use built-in minimal web from mcp_pipe to avoid side effects
-    from mcp_pipe import create_app
+    from mcp_pipe import create_app, serve_app, fork_web_workers
+    # 多进程模式（MCP_WEB_WORKERS>1）需在创建应用前 fork
+    sock = fork_web_workers(host='0.0.0.0', port=port)
     app = create_app()
     click.echo(f"Web管理界面已启动，访问 http://localhost:{port}")
-    app.run(host='0.0.0.0', port=port)
+    serve_app(app, host='0.0.0.0', port=port, sock=sock)
 
 @cli.command()
 @click.argument('name')
@@ -168,11 +202,7 @@ def web(port):
 @click.option('--disabled/--enabled', default=False, help='是否禁用')
 def add_server(name, type, command, args, url, env, disabled):
     """添加服务器配置"""
-    config = {}
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            config = json.load(f)
-    
+    config = load_config() or {}
     servers = config.get("mcpServers", {})
     
     if name in servers:
@@ -196,7 +226,12 @@ def add_server(name, type, command, args, url, env, disabled):
             click.echo("stdio类型服务器必须指定--command")
             return
         server_config["command"] = command
-        server_config["args"] = args.split() if args else []
+        # 按shell规则拆分，带引号的参数（如 --msg "hello world"）保持为一个
+        try:
+            server_config["args"] = shlex.split(args) if args else []
+        except ValueError:
+            click.echo("--args格式错误，引号未闭合")
+            return
     else:
         if not url:
             click.echo(f"{type}类型服务器必须指定--url")
@@ -205,9 +240,7 @@ def add_server(name, type, command, args, url, env, disabled):
     
     servers[name] = server_config
     config["mcpServers"] = servers
-    
-    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    save_config(config)
     
     click.echo(f"服务器 {name} 已添加")
 
@@ -215,13 +248,11 @@ def add_server(name, type, command, args, url, env, disabled):
 @click.argument('name')
 def remove_server(name):
     """删除服务器配置"""
-    if not os.path.exists(CONFIG_PATH):
+    config = load_config()
+    if config is None:
         click.echo("配置文件不存在")
         return
     
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        config = json.load(f)
-    
     servers = config.get("mcpServers", {})
     
     if name not in servers:
@@ -230,9 +261,7 @@ def remove_server(name):
     
     del servers[name]
     config["mcpServers"] = servers
-    
-    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+    save_config(config)
     
     click.echo(f"服务器 {name} 已删除")
 
@@ -0,0 +1,516 @@
+// 最近一次仪表盘数据；切换服务等操作直接复用，不再单独请求
+let lastDashboard = null;
+let renderFrame = 0;
+// DOM 写入统一放到下一帧执行；同一帧内收到多份数据时只渲染最新一份
+function applyDashboard(d){
+    if(!d || d.error){ return; }
+    lastDashboard = d;
+    if(!renderFrame){ renderFrame = requestAnimationFrame(flushDashboard); }
+}
+function flushDashboard(){
+    renderFrame = 0;
+    const d = lastDashboard;
+    renderDashboard(d.metrics);
+    renderServerCards(d.status);
+    renderServiceToggle(d.service);
+}
+async function refreshStatus(){
+    applyDashboard(await fetch('/api/dashboard').then(r=>r.json()));
+}
+const POLL_INTERVAL_MS = 5000;
+let pollTimer = null;
+// 最后的退路：定时拉取（长轮询也失败时）
+function startPolling(){
+    if(pollTimer){ return; }
+    refreshStatus();
+    pollTimer = setInterval(refreshStatus, POLL_INTERVAL_MS);
+}
+function stopPolling(){
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+let longPoll = null;
+// 推送不可用时的长轮询：服务端在数据变化（ETag 不同）时才返回，超时返回 304
+async function startLongPoll(){
+    if(longPoll){ return; }
+    const ctrl = longPoll = new AbortController();
+    let etag = '';
+    try {
+        while(longPoll === ctrl){
+            const res = await fetch('/api/dashboard/wait', { headers: etag ? { 'If-None-Match': etag } : {}, cache: 'no-store', signal: ctrl.signal });
+            if(res.status === 304){ continue; }
+            if(!res.ok){ throw new Error('HTTP ' + res.status); }
+            etag = res.headers.get('ETag') || '';
+            applyDashboard(await res.json());
+        }
+    } catch(e) {
+        // 主动中止（页面隐藏）时不再回退
+        if(longPoll === ctrl){ longPoll = null; startPolling(); }
+    }
+}
+let eventSource = null;
+// 服务端在状态变化时推送仪表盘数据（status 事件）
+function subscribeDashboard(){
+    if(eventSource || longPoll || pollTimer){ return; }
+    if(!window.EventSource){ startLongPoll(); return; }
+    const es = eventSource = new EventSource('/api/events');
+    es.addEventListener('status', e => applyDashboard(JSON.parse(e.data)));
+    es.onerror = () => {
+        if(es.readyState === EventSource.CLOSED){
+            if(eventSource === es){ eventSource = null; }
+            startLongPoll();
+        }
+    };
+}
+// 页面隐藏时断开推送/长轮询/停止拉取，重新可见时恢复（推送连接会先发送一份完整数据）
+function pauseDashboard(){
+    if(eventSource){ eventSource.close(); eventSource = null; }
+    if(longPoll){ const ctrl = longPoll; longPoll = null; ctrl.abort(); }
+    stopPolling();
+}
+async function doRestart(){
+    const res = await fetch('/api/restart', { method: 'POST' });
+    const data = await res.json();
+    alert(data.message || '已触发重启');
+}
+
+// 每次推送都要更新的节点只查找一次；脚本位于页面中部，因此首次使用时再缓存
+const domCache = new Map();
+function byId(id){
+    let el = domCache.get(id);
+    if(!el){ el = document.getElementById(id); domCache.set(id, el); }
+    return el;
+}
+function setText(el, text){
+    text = String(text);
+    if(el.textContent !== text) el.textContent = text;
+}
+
+function renderDashboard(metrics){
+    if(!metrics || metrics.error){ return; }
+    setText(byId('metric-servers'), metrics.num_servers ?? '-');
+    setText(byId('metric-running'), metrics.running_servers ?? '-');
+    setText(byId('metric-endpoints'), metrics.num_endpoints ?? '-');
+    setText(byId('metric-tools'), metrics.total_tools ?? '-');
+}
+
+const serverCards = new Map();
+function createServerCard(name){
+    const card = document.createElement('div');
+    card.className = 'server-card';
+    const h4 = document.createElement('h4');
+    h4.textContent = name;
+    card.dataset.name = name;
+    const gear = document.createElement('span'); 
+    gear.textContent='⚙'; 
+    gear.title='设置'; 
+    gear.style.float='right'; 
+    gear.style.cursor='pointer';
+    gear.dataset.action = 'edit';
+    const meta = document.createElement('div');
+    meta.className = 'server-meta';
+    const badge = document.createElement('span');
+    const count = document.createElement('span');
+    meta.appendChild(badge); meta.appendChild(count);
+    const list = document.createElement('div');
+    card.appendChild(gear); card.appendChild(h4); card.appendChild(meta); card.appendChild(list);
+    return {card, badge, count, list, chips: new Map()};
+}
+function updateToolChips(entry, tools){
+    // 按工具名复用已有节点，只增删/更新变化的部分
+    const want = new Set(tools.map(t => t.name || 'unknown'));
+    entry.chips.forEach((chip, key) => {
+        if(!want.has(key)){ chip.remove(); entry.chips.delete(key); }
+    });
+    let prev = null;
+    tools.forEach(t => {
+        const key = t.name || 'unknown';
+        let chip = entry.chips.get(key);
+        if(!chip){
+            chip = document.createElement('span');
+            chip.className = 'tool-chip';
+            chip.textContent = key;
+            entry.chips.set(key, chip);
+        }
+        // 仅在位置不对时移动节点，保持与服务端一致的顺序
+        const expected = prev ? prev.nextSibling : entry.list.firstChild;
+        if(expected !== chip) entry.list.insertBefore(chip, expected);
+        prev = chip;
+    });
+}
+function renderServerCards(status){
+    const wrap = byId('server-grid');
+    const toolsMap = (status && status.tools) || {};
+    const serverNames = Object.keys(toolsMap).sort();
+    if(serverNames.length === 0){
+        serverCards.clear();
+        wrap.textContent = '(暂无工具信息)';
+        return;
+    }
+    if(serverCards.size === 0) wrap.textContent = '';
+    const want = new Set(serverNames);
+    serverCards.forEach((entry, name) => {
+        if(!want.has(name)){ entry.card.remove(); serverCards.delete(name); }
+    });
+    let prev = null;
+    serverNames.forEach(name => {
+        const s = toolsMap[name] || {};
+        const tools = s.tools || [];
+        let entry = serverCards.get(name);
+        if(!entry){ entry = createServerCard(name); serverCards.set(name, entry); }
+        const cls = 'status-badge ' + (s.badge_class || 'status-stopped');
+        const txt = s.status_text || '未运行';
+        const cnt = '工具: ' + tools.length;
+        if(entry.badge.className !== cls) entry.badge.className = cls;
+        setText(entry.badge, txt);
+        setText(entry.count, cnt);
+        updateToolChips(entry, tools);
+        const expected = prev ? prev.nextSibling : wrap.firstChild;
+        if(expected !== entry.card) wrap.insertBefore(entry.card, expected);
+        prev = entry.card;
+    });
+}
+
+
+async function toggleService(){
+    const btn = document.getElementById('btn-toggle');
+    btn.disabled = true; btn.textContent = '处理中...';
+    try{
+        const svc = (lastDashboard && lastDashboard.service) || await (await fetch('/api/service')).json();
+        if(svc.running){ await fetch('/api/stop', { method: 'POST' }); }
+        else { await fetch('/api/start', { method: 'POST' }); }
+        setTimeout(refreshStatus, 800);
+    } finally {
+        setTimeout(()=>{ btn.disabled=false; }, 900);
+    }
+}
+
+function renderServiceToggle(svc){
+    setText(byId('btn-toggle'), (svc && svc.running) ? '关闭服务' : '打开服务');
+}
+
+// 弹窗功能
+function openEditServerModal(name, entry){
+    const modal = document.getElementById('modal-edit');
+    modal.style.display = 'block';
+    document.getElementById('edit-old-name').value = name;
+    document.getElementById('edit-name').value = name;
+    document.getElementById('edit-type').value = entry.type||'';
+    document.getElementById('edit-command').value = entry.command||'';
+    document.getElementById('edit-args').value = joinArgs(entry.args||[]);
+    document.getElementById('edit-url').value = entry.url||'';
+    document.getElementById('edit-env').value = entry.env?JSON.stringify(entry.env):'';
+    document.getElementById('edit-disabled').value = String(!!entry.disabled);
+}
+
+// 保存类操作：同一目标（keyOf 给出，如服务器名/接入点名）短时间内的多次点击只提交最后一次；
+// 各次保存都是读取-修改-写回整个配置，因此排队依次执行，保存进行中再点击会在其后执行而不是被丢弃
+const SAVE_DEBOUNCE_MS = 400;
+let saveChain = Promise.resolve();
+function debounceSave(fn, keyOf=()=>'', ms=SAVE_DEBOUNCE_MS){
+    const timers = new Map();
+    return function(...args){
+        const key = keyOf(...args);
+        clearTimeout(timers.get(key));
+        timers.set(key, setTimeout(()=>{
+            timers.delete(key);
+            saveChain = saveChain.then(()=>fn(...args)).catch(e => alert('保存失败: ' + e));
+        }, ms));
+    };
+}
+
+// 参数按 shell 规则拼接（服务端用 shlex 拆分），含空格或引号的参数加单引号
+function joinArgs(args){
+    return args.map(a => /^[\w@%+=:,.\/-]+$/.test(a) ? a : "'" + String(a).replace(/'/g, "'\"'\"'") + "'").join(' ');
+}
+
+async function _saveEditServer(){
+    const oldName = document.getElementById('edit-old-name').value.trim();
+    const newName = document.getElementById('edit-name').value.trim();
+    const type = document.getElementById('edit-type').value.trim();
+    const command = document.getElementById('edit-command').value.trim();
+    const args = document.getElementById('edit-args').value.trim();
+    const url = document.getElementById('edit-url').value.trim();
+    const envStr = document.getElementById('edit-env').value.trim();
+    const disabledStr = document.getElementById('edit-disabled').value.trim();
+    let env={}; if(envStr){ try{ env=JSON.parse(envStr); }catch(e){ alert('env需为JSON'); return; } }
+    const payload = { type, command, args, url, env, disabled: (disabledStr||'').toLowerCase()==='true' };
+    if(newName && newName!==oldName){
+        const addRes = await fetch('/api/servers', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ name:newName, ...payload }) });
+        const addData = await addRes.json(); if(addData.status!=='success'){ alert(addData.message||'改名失败'); return; }
+        await fetch('/api/servers/'+encodeURIComponent(oldName), { method:'DELETE' });
+    } else {
+        const up = await fetch('/api/servers/'+encodeURIComponent(oldName), { method:'PUT', headers:{'Content-Type':'application/json'}, body: JSON.stringify(payload) });
+        const d = await up.json(); if(d.status!=='success'){ alert(d.message||'保存失败'); return; }
+    }
+    closeModal('modal-edit');
+    await refreshStatus();
+}
+const saveEditServer = debounceSave(_saveEditServer, ()=>document.getElementById('edit-old-name').value);
+
+async function deleteEditServer(){
+    const oldName = document.getElementById('edit-old-name').value.trim();
+    const res = await fetch('/api/servers/'+encodeURIComponent(oldName), { method:'DELETE' });
+    const d = await res.json(); if(d.status!=='success'){ alert(d.message||'删除失败'); return; }
+    closeModal('modal-edit'); 
+    await refreshStatus();
+}
+
+// 添加类型弹窗
+function openAddTypeModal(){ document.getElementById('modal-add-type').style.display='block'; }
+async function _saveAddType(){
+    const name = document.getElementById('add-name').value.trim();
+    const type = document.getElementById('add-type').value.trim();
+    const command = document.getElementById('add-command').value.trim();
+    const args = document.getElementById('add-args').value.trim();
+    const url = document.getElementById('add-url').value.trim();
+    const envStr = document.getElementById('add-env').value.trim();
+    const disabledStr = document.getElementById('add-disabled').value.trim();
+    if(!name || !type){ alert('名称与类型必填'); return; }
+    let env={}; if(envStr){ try{ env=JSON.parse(envStr); }catch(e){ alert('env需为JSON'); return; } }
+    const payload={ name, type, command, args, url, env, disabled:(disabledStr||'').toLowerCase()==='true' };
+    const res = await fetch('/api/servers', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify(payload) });
+    const d = await res.json(); if(d.status!=='success'){ alert(d.message||'添加失败'); return; }
+    closeModal('modal-add-type'); 
+    await refreshStatus();
+}
+const saveAddType = debounceSave(_saveAddType, ()=>document.getElementById('add-name').value.trim());
+
+// 添加JSON弹窗
+function openAddJsonModal(){ document.getElementById('modal-add-json').style.display='block'; }
+async function _saveAddJson(){
+    const txt = document.getElementById('add-json').value;
+    let obj={}; try{ obj=JSON.parse(txt||'{}'); }catch(e){ alert('JSON解析失败'); return; }
+    const res = await fetch('/api/servers/json', { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ mcpServers: obj }) });
+    const d = await res.json(); if(d.status!=='success'){ alert(d.message||'合并失败'); return; }
+    closeModal('modal-add-json'); 
+    await refreshStatus();
+}
+const saveAddJson = debounceSave(_saveAddJson);
+
+function closeModal(id){ document.getElementById(id).style.display='none'; }
+
+// 接入点设置功能
+function openEndpointsModal(){ 
+    document.getElementById('modal-endpoints').style.display='block';
+    loadEndpoints();
+}
+
+async function loadEndpoints(){
+    try {
+        const res = await fetch('/api/config');
+        const data = await res.json();
+        const endpoints = data.mcpEndpoints || {};
+        const container = document.getElementById('endpoints-list');
+        container.innerHTML = '';
+
+        Object.keys(endpoints).forEach(name => {
+            const ep = endpoints[name] || {};
+            const div = document.createElement('div');
+            div.style.border = '1px solid #e5e7eb';
+            div.style.borderRadius = '8px';
+            div.style.padding = '12px';
+            div.style.margin = '8px 0';
+            div.dataset.name = name;
+
+            const title = document.createElement('div');
+            title.innerHTML = '<strong>' + name + '</strong>';
+
+            const row = document.createElement('div');
+            row.className = 'row';
+
+            const nameInput = document.createElement('input');
+            nameInput.value = name;
+            nameInput.placeholder = '名称';
+            nameInput.id = 'ep-name-' + name;
+            nameInput.className = 'ep-name';
+
+            const urlInput = document.createElement('input');
+            urlInput.value = ep.url || '';
+            urlInput.placeholder = 'WebSocket URL';
+            urlInput.id = 'ep-url-' + name;
+            urlInput.className = 'ep-url';
+
+            const enabledInput = document.createElement('input');
+            enabledInput.value = String(ep.enabled !== false);  // 未写 enabled 即为启用
+            enabledInput.placeholder = 'enabled true|false';
+            enabledInput.id = 'ep-enabled-' + name;
+            enabledInput.className = 'ep-enabled';
+
+            row.appendChild(nameInput);
+            row.appendChild(urlInput);
+            row.appendChild(enabledInput);
+
+            const btns = document.createElement('div');
+            btns.className = 'row';
+            btns.style.marginTop = '8px';
+
+            const saveBtn = document.createElement('button');
+            saveBtn.textContent = '保存';
+            saveBtn.dataset.action = 'save';
+
+            const delBtn = document.createElement('button');
+            delBtn.textContent = '删除';
+            delBtn.className = 'stop';
+            delBtn.dataset.action = 'delete';
+
+            btns.appendChild(saveBtn);
+            btns.appendChild(delBtn);
+
+            div.appendChild(title);
+            div.appendChild(row);
+            div.appendChild(btns);
+            container.appendChild(div);
+        });
+    } catch(e) {
+        alert('加载接入点失败: ' + e);
+    }
+}
+
+async function _saveEndpoint(oldName, newName, url, enabledStr){
+    try {
+        const res = await fetch('/api/config');
+        const data = await res.json();
+        const endpoints = data.mcpEndpoints || {};
+
+        if(newName !== oldName) {
+            // 改名：先添加新的，再删除旧的
+            endpoints[newName] = {
+                url: url,
+                enabled: (enabledStr || '').toLowerCase() === 'true'
+            };
+            delete endpoints[oldName];
+        } else {
+            // 更新现有
+            endpoints[oldName] = {
+                url: url,
+                enabled: (enabledStr || '').toLowerCase() === 'true'
+            };
+        }
+
+        const updateRes = await fetch('/api/config', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...data, mcpEndpoints: endpoints })
+        });
+
+        const result = await updateRes.json();
+        if(result.status !== 'success') {
+            alert(result.message || '保存失败');
+            return;
+        }
+
+        alert('已保存');
+        loadEndpoints();
+        refreshStatus();
+    } catch(e) {
+        alert('保存失败: ' + e);
+    }
+}
+const saveEndpoint = debounceSave(_saveEndpoint, oldName=>oldName);
+
+async function deleteEndpoint(name){
+    if(!confirm('确定要删除接入点 "' + name + '" 吗？')) return;
+
+    try {
+        const res = await fetch('/api/config');
+        const data = await res.json();
+        const endpoints = data.mcpEndpoints || {};
+        delete endpoints[name];
+
+        const updateRes = await fetch('/api/config', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...data, mcpEndpoints: endpoints })
+        });
+
+        const result = await updateRes.json();
+        if(result.status !== 'success') {
+            alert(result.message || '删除失败');
+            return;
+        }
+
+        alert('已删除');
+        loadEndpoints();
+        refreshStatus();
+    } catch(e) {
+        alert('删除失败: ' + e);
+    }
+}
+
+async function _addNewEndpoint(){
+    const name = document.getElementById('new-ep-name').value.trim();
+    const url = document.getElementById('new-ep-url').value.trim();
+    const enabledStr = document.getElementById('new-ep-enabled').value.trim();
+
+    if(!name || !url) {
+        alert('名称和URL必填');
+        return;
+    }
+
+    try {
+        const res = await fetch('/api/config');
+        const data = await res.json();
+        const endpoints = data.mcpEndpoints || {};
+
+        if(endpoints[name]) {
+            alert('接入点 "' + name + '" 已存在');
+            return;
+        }
+
+        endpoints[name] = {
+            url: url,
+            enabled: (enabledStr || '').toLowerCase() === 'true'
+        };
+
+        const updateRes = await fetch('/api/config', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ...data, mcpEndpoints: endpoints })
+        });
+
+        const result = await updateRes.json();
+        if(result.status !== 'success') {
+            alert(result.message || '添加失败');
+            return;
+        }
+
+        alert('已添加');
+        document.getElementById('new-ep-name').value = '';
+        document.getElementById('new-ep-url').value = '';
+        document.getElementById('new-ep-enabled').value = '';
+        loadEndpoints();
+        refreshStatus();
+    } catch(e) {
+        alert('添加失败: ' + e);
+    }
+}
+const addNewEndpoint = debounceSave(_addNewEndpoint, ()=>document.getElementById('new-ep-name').value.trim());
+
+// 卡片与接入点行的按钮由容器上的单个监听器分发，重建/新增行时无需逐个绑定
+function bindDelegatedActions(){
+    byId('server-grid').addEventListener('click', async e => {
+        const btn = e.target.closest('[data-action="edit"]');
+        if(!btn) return;
+        const name = btn.closest('[data-name]').dataset.name;
+        // 获取当前配置并打开编辑弹窗
+        const cfg = await (await fetch('/api/config')).json();
+        const entry = (cfg && cfg.mcpServers && cfg.mcpServers[name]) || {};
+        openEditServerModal(name, entry);
+    });
+    byId('endpoints-list').addEventListener('click', e => {
+        const btn = e.target.closest('[data-action]');
+        if(!btn) return;
+        const row = btn.closest('[data-name]');
+        const name = row.dataset.name;
+        if(btn.dataset.action === 'save'){
+            saveEndpoint(name, row.querySelector('.ep-name').value, row.querySelector('.ep-url').value, row.querySelector('.ep-enabled').value);
+        } else if(btn.dataset.action === 'delete'){
+            deleteEndpoint(name);
+        }
+    });
+}
+
+// 初始化：绑定事件，进入页面即订阅状态推送
+document.addEventListener('DOMContentLoaded', ()=>{ bindDelegatedActions(); subscribeDashboard(); });
+document.addEventListener('visibilitychange', ()=>{ document.hidden ? pauseDashboard() : subscribeDashboard(); });
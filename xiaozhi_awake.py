@@ -3,9 +3,11 @@ from mcp.server.fastmcp import FastMCP
 import sys
 import logging
 import time
+import atexit
 import threading
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import pygame  # 音频播放库
 import os  # 用于路径处理
 
 # 配置日志（详细输出便于排查问题）
@@ -28,100 +30,160 @@ EXIT_AUDIO_FILE = os.path.abspath("static/exit.wav")  # 待命音频（新增）
 # 音频线程锁（解决多线程同时播放冲突）
 audio_lock = threading.Lock()
 
-# 初始化音频模块并检查状态
-try:
-    pygame.mixer.init()
-    if not pygame.mixer.get_init():
-        raise Exception("Pygame音频初始化失败，未检测到可用音频设备")
-    logger.info("Pygame音频模块初始化成功")
-except Exception as e:
-    logger.error(f"音频模块初始化失败：{str(e)}，服务可能无法播放声音")
+# pygame（音频播放库）导入时会加载SDL并探测音频设备，较慢；推迟到第一次播放时再导入和初始化
+_pygame = None
+
+
+def get_pygame():
+    """返回已初始化音频模块的pygame，首次调用时导入（在audio_lock下调用）"""
+    global _pygame
+    if _pygame is None:
+        try:
+            import pygame
+            pygame.mixer.init()
+            if not pygame.mixer.get_init():
+                raise Exception("Pygame音频初始化失败，未检测到可用音频设备")
+        except Exception as e:
+            logger.error(f"音频模块初始化失败：{str(e)}，无法播放声音")
+            raise
+        logger.info("Pygame音频模块初始化成功")
+        _pygame = pygame
+    return _pygame
 
 
 # 多任务管理器（支持并发定时任务，新增音频类型区分）
 class TaskManager:
     def __init__(self):
-        self.tasks = {}  # {task_id: {"timer": 定时器, "delay": 秒, "message": 消息, "status": 状态, "audio_type": 音频类型}}
+        self.tasks = {}  # {task_id: {"deadline": 到期时刻, "delay": 秒, "message": 消息, "status": 状态, "audio_type": 音频类型}}
         self.task_counter = 1  # 任务ID自增器
+        # 所有任务共用一个调度线程（而不是每个任务一个Timer线程）：
+        # 堆按到期时刻排序，取消的任务不出堆，到期弹出时跳过
+        self._heap = []  # [(deadline, task_id)]
+        self._cv = threading.Condition()
+        # 播放本就由audio_lock串行化，一个常驻播放线程即可，到期任务在其队列中排队
+        self._audio_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio")
+        self._sounds = {}  # {音频文件: pygame.mixer.Sound}，首次播放时解码，之后直接复用
+        # 任务计数随状态变化维护（在self._cv下修改），状态查询无需遍历全部任务
+        self._counts = {"total": 0, "running": 0, "awake": 0, "standby": 0}
+        threading.Thread(target=self._scheduler_loop, name="awake-scheduler", daemon=True).start()
+        atexit.register(self.shutdown)
 
     def add_task(self, delay_seconds, message, audio_type="awake"):
         """
         添加定时任务（新增audio_type参数区分音频类型）
         :param audio_type: 音频类型，"awake"播放alert.wav，"standby"播放exit.wav
         """
-        task_id = f"task_{self.task_counter}"
-        self.task_counter += 1
-
-        # 创建非阻塞定时器
-        timer = threading.Timer(
-            interval=delay_seconds,
-            function=self._execute_task,
-            args=[task_id]
-        )
-
-        # 存储任务信息（新增audio_type）
-        self.tasks[task_id] = {
-            "timer": timer,
-            "delay": delay_seconds,
-            "message": message,
-            "status": "pending",
-            "create_time": datetime.now().isoformat(),
-            "audio_type": audio_type  # 记录音频类型
-        }
+        deadline = time.monotonic() + delay_seconds
+        # 任务表和自增ID在self._cv下修改，与调度线程、get_all_tasks的遍历互斥
+        with self._cv:
+            task_id = f"task_{self.task_counter}"
+            self.task_counter += 1
+
+            # 存储任务信息（新增audio_type）
+            self.tasks[task_id] = {
+                "deadline": deadline,
+                "delay": delay_seconds,
+                "message": message,
+                "status": "running",
+                "create_time": datetime.now().isoformat(),
+                "audio_type": audio_type  # 记录音频类型
+            }
 
-        timer.start()
-        self.tasks[task_id]["status"] = "running"
+            # 入堆并唤醒调度线程（新任务可能比当前堆顶更早到期）
+            self._counts["total"] += 1
+            self._counts["running"] += 1
+            self._counts[audio_type] = self._counts.get(audio_type, 0) + 1
+            heapq.heappush(self._heap, (deadline, task_id))
+            self._cv.notify()
         logger.info(f"任务 {task_id} 创建成功（{delay_seconds}秒后执行，音频类型：{audio_type}）")
         return task_id
 
+    def _scheduler_loop(self):
+        """调度线程：等待堆顶任务到期后执行（播放交给播放线程，不阻塞调度）"""
+        while True:
+            with self._cv:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cv.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, task_id = heapq.heappop(self._heap)
+            # 单个任务出错不能带走唯一的调度线程，否则之后的任务都不会再触发
+            try:
+                self._execute_task(task_id)
+            except Exception as e:
+                logger.exception(f"任务 {task_id} 调度执行出错")
+                task = self.tasks.get(task_id)
+                if task is not None and task.get("status") == "running":
+                    self._finish(task, f"failed: {str(e)}")
+
     def _execute_task(self, task_id):
         """执行任务：根据音频类型播放对应音频"""
         task = self.tasks.get(task_id)
         if not task:
             logger.warning(f"任务 {task_id} 不存在，跳过执行")
             return
+        if task["status"] != "running":
+            # 出堆后、执行前被取消
+            return
 
+        # 根据任务的audio_type选择音频文件，交给播放线程播放，完成后更新任务状态
+        audio_file = AUDIO_FILE if task["audio_type"] == "awake" else EXIT_AUDIO_FILE
         try:
-            # 1. 根据任务的audio_type选择音频文件
-            audio_file = AUDIO_FILE if task["audio_type"] == "awake" else EXIT_AUDIO_FILE
-            # 2. 播放音频（加锁确保线程安全）
-            self._play_audio(audio_file)
-            # 3. 更新任务状态
-            task["status"] = "completed"
-            task["awake_time"] = datetime.now().isoformat()
-            logger.info(f"任务 {task_id} 执行完成：{task['message']}（音频类型：{task['audio_type']}）")
-        except Exception as e:
-            task["status"] = f"failed: {str(e)}"
-            logger.error(f"任务 {task_id} 执行失败：{str(e)}")
+            future = self._audio_pool.submit(self._play_audio, audio_file)
+        except RuntimeError:
+            # 播放线程已随进程退出关闭
+            self._finish(task, "cancelled")
+            return
+        future.add_done_callback(lambda f: self._finalize(task_id, f))
+
+    def _finish(self, task, status):
+        """把运行中的任务切换到结束状态并更新计数；任务已不在运行中（如已取消）时返回False"""
+        with self._cv:
+            if task["status"] != "running":
+                return False
+            task["status"] = status
+            self._counts["running"] -= 1
+            return True
+
+    def _finalize(self, task_id, future):
+        """播放结束后更新任务状态"""
+        task = self.tasks[task_id]
+        if future.cancelled():
+            # 退出时仍在排队的播放被shutdown()丢弃
+            self._finish(task, "cancelled")
+            return
+        error = future.exception()
+        if error is None:
+            if self._finish(task, "completed"):
+                task["awake_time"] = datetime.now().isoformat()
+                logger.info(f"任务 {task_id} 执行完成：{task['message']}（音频类型：{task['audio_type']}）")
+        elif self._finish(task, f"failed: {str(error)}"):
+            logger.error(f"任务 {task_id} 执行失败：{str(error)}")
 
     def _play_audio(self, audio_file):
         """播放指定音频文件（修改为接收参数，支持动态切换音频）"""
         with audio_lock:
+            pygame = get_pygame()
             try:
-                # 检查文件是否存在
-                if not os.path.exists(audio_file):
-                    raise FileNotFoundError(f"音频文件不存在：{audio_file}")
-                # 检查文件是否可读
-                if not os.access(audio_file, os.R_OK):
-                    raise PermissionError(f"无权限读取音频文件：{audio_file}")
-
-                # 加载并播放音频
-                pygame.mixer.music.load(audio_file)
-                pygame.mixer.music.play()
+                # 播放音频（已解码的Sound对象，不再每次重新加载文件）
+                # 不预先检查文件是否存在/可读，首次打开失败时再转换为对应的错误信息
+                sound = self._sound(audio_file)
+                channel = sound.play()
                 logger.info(f"开始播放音频：{audio_file}")
 
-                # 等待播放完成
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
+                # 等待播放完成：按音频时长整段休眠，只在结尾短暂确认，不再每0.1秒轮询
+                time.sleep(sound.get_length())
+                while channel is not None and channel.get_busy():
+                    time.sleep(0.05)
 
                 logger.info("音频播放完成")
 
             except FileNotFoundError as e:
-                logger.error(str(e))
-                raise
+                error_msg = f"音频文件不存在：{audio_file}"
+                logger.error(error_msg)
+                raise FileNotFoundError(error_msg) from e
             except PermissionError as e:
-                logger.error(str(e))
-                raise
+                error_msg = f"无权限读取音频文件：{audio_file}"
+                logger.error(error_msg)
+                raise PermissionError(error_msg) from e
             except pygame.error as e:
                 error_msg = f"音频播放失败（格式可能不兼容）：{str(e)}"
                 logger.error(error_msg)
@@ -130,33 +192,50 @@ class TaskManager:
                 logger.error(f"音频播放异常：{str(e)}")
                 raise
 
+    def _sound(self, audio_file):
+        """音频文件对应的Sound对象，每个文件只读取和解码一次"""
+        sound = self._sounds.get(audio_file)
+        if sound is None:
+            # 自己打开文件，缺失/无权限时抛出标准的 FileNotFoundError/PermissionError
+            with open(audio_file, "rb") as f:
+                sound = self._sounds[audio_file] = get_pygame().mixer.Sound(file=f)
+        return sound
+
+    def shutdown(self):
+        """停止播放线程：丢弃排队中的播放，不等待正在播放的音频结束"""
+        self._audio_pool.shutdown(wait=False, cancel_futures=True)
+
     def get_task(self, task_id):
         """获取单个任务详情（包含音频类型）"""
         return self.tasks.get(task_id)
 
     def get_all_tasks(self):
         """获取所有任务的简化信息（包含音频类型）"""
-        return {
-            task_id: {
-                "task_id": task_id,
-                "delay": task["delay"],
-                "message": task["message"],
-                "status": task["status"],
-                "create_time": task["create_time"],
-                "awake_time": task.get("awake_time"),
-                "audio_type": task["audio_type"]  # 新增：返回音频类型
+        with self._cv:
+            return {
+                task_id: {
+                    "task_id": task_id,
+                    "delay": task["delay"],
+                    "message": task["message"],
+                    "status": task["status"],
+                    "create_time": task["create_time"],
+                    "awake_time": task.get("awake_time"),
+                    "audio_type": task["audio_type"]  # 新增：返回音频类型
+                }
+                for task_id, task in self.tasks.items()
             }
-            for task_id, task in self.tasks.items()
-        }
+
+    def get_counts(self):
+        """任务计数：total / running / awake / standby"""
+        with self._cv:
+            return dict(self._counts)
 
     def cancel_task(self, task_id):
-        """取消指定任务（逻辑不变）"""
+        """取消指定任务（只标记状态，堆中的条目到期时由调度线程跳过）"""
         task = self.tasks.get(task_id)
         if not task:
             return False
-        if task["status"] == "running":
-            task["timer"].cancel()
-            task["status"] = "cancelled"
+        if self._finish(task, "cancelled"):
             logger.info(f"任务 {task_id} 已取消")
             return True
         return False
@@ -191,7 +270,7 @@ def set_awake_timer(delay_seconds: int, message: str) -> dict:
             "result": {
                 "task_id": task_id,
                 "message": f"唤醒任务已创建（{delay_seconds}秒后执行）",
-                "create_time": datetime.now().isoformat(),
+                "create_time": task_manager.get_task(task_id)["create_time"],
                 "audio_file": AUDIO_FILE
             }
         }
@@ -224,7 +303,7 @@ def set_standby_timer(delay_seconds: int, message: str) -> dict:
             "result": {
                 "task_id": task_id,
                 "message": f"待命任务已创建（{delay_seconds}秒后执行）",
-                "create_time": datetime.now().isoformat(),
+                "create_time": task_manager.get_task(task_id)["create_time"],
                 "audio_file": EXIT_AUDIO_FILE  # 返回待命音频路径
             }
         }
@@ -261,13 +340,19 @@ def get_awake_tasks(task_id: str = None) -> dict:
             }
         else:
             all_tasks = task_manager.get_all_tasks()
+            # 计数与返回的任务列表取自同一快照，一次遍历统计完
+            active = awake = standby = 0
+            for t in all_tasks.values():
+                active += t["status"] == "running"
+                awake += t["audio_type"] == "awake"
+                standby += t["audio_type"] == "standby"
             return {
                 "success": True,
                 "result": {
                     "total_tasks": len(all_tasks),
-                    "active_tasks": len([t for t in all_tasks.values() if t["status"] == "running"]),
-                    "awake_tasks": len([t for t in all_tasks.values() if t["audio_type"] == "awake"]),  # 新增：唤醒任务数
-                    "standby_tasks": len([t for t in all_tasks.values() if t["audio_type"] == "standby"]),  # 新增：待命任务数
+                    "active_tasks": active,
+                    "awake_tasks": awake,  # 新增：唤醒任务数
+                    "standby_tasks": standby,  # 新增：待命任务数
                     "tasks": all_tasks
                 }
             }
@@ -302,6 +387,7 @@ def cancel_awake_task(task_id: str) -> dict:
 @mcp.tool()
 def get_awake_service_status() -> dict:
     """获取服务运行状态（包含唤醒和待命音频信息）"""
+    counts = task_manager.get_counts()
     return {
         "success": True,
         "result": {
@@ -313,11 +399,11 @@ def get_awake_service_status() -> dict:
             "awake_audio_exists": os.path.exists(AUDIO_FILE),
             "standby_audio_file": EXIT_AUDIO_FILE,
             "standby_audio_exists": os.path.exists(EXIT_AUDIO_FILE),
-            "pygame_initialized": bool(pygame.mixer.get_init()),
-            "total_tasks": len(task_manager.get_all_tasks()),
-            "active_tasks": len([t for t in task_manager.get_all_tasks().values() if t["status"] == "running"]),
-            "awake_tasks": len([t for t in task_manager.get_all_tasks().values() if t["audio_type"] == "awake"]),
-            "standby_tasks": len([t for t in task_manager.get_all_tasks().values() if t["audio_type"] == "standby"])
+            "pygame_initialized": _pygame is not None and bool(_pygame.mixer.get_init()),
+            "total_tasks": counts["total"],
+            "active_tasks": counts["running"],
+            "awake_tasks": counts["awake"],
+            "standby_tasks": counts["standby"]
         }
     }
 
@@ -325,4 +411,8 @@ def get_awake_service_status() -> dict:
 if __name__ == "__main__":
     mcp.start_time = time.time()
     logger.info(f"XiaozhiAwake服务启动，唤醒音频：{AUDIO_FILE}，待命音频：{EXIT_AUDIO_FILE}")
-    mcp.run(transport="stdio")
\ No newline at end of file
+    try:
+        mcp.run(transport="stdio")
+    finally:
+        # 解释器退出时会先等播放线程跑完队列中的播放，atexit回调来不及取消，这里先行关闭
+        task_manager.shutdown()
\ No newline at end of file